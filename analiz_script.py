@@ -11,14 +11,20 @@ import warnings
 import concurrent.futures
 import sys
 import os
-from tefas import Crawler
+from crawler_havuzu import havuzdan_crawler
 from dateutil.relativedelta import relativedelta
+from veri_temizleme import gecmisleri_temizle
+from fon_siniflandirma import kategoriye_gore_filtrele, kategori_secenegini_oku
+from sonuc_deposu import sonucu_kaydet, calisma_tamamlandi
+from fon_metrikleri import hesapla_cok_donemli_metrikler, cok_donemli_sutun_sirasi, ufuk_sutun_adlari
+from fon_portfoyu import kisa_liste_portfoyleri
 
 # Uyarıları kapat
 warnings.filterwarnings('ignore')
 
 # --- AYARLAR ---
 ANALIZ_SURESI_AY = 3
+ANALIZ_UFUKLARI_AY = [1, 3, 6, 12] # 'coklu' modunda hesaplanan dönemler
 MAX_WORKERS = 10
 INPUT_FILE = "filtrelenmis_fonlar.txt"
 
@@ -49,19 +55,19 @@ def fetch_data_for_fund_parallel(args):
     """
     fon_kodu, start_date, end_date = args
     try:
-        crawler = Crawler()
-        df = crawler.fetch(
-            start=start_date.strftime("%Y-%m-%d"),
-            end=end_date.strftime("%Y-%m-%d"),
-            name=fon_kodu,
-            columns=["date", "price", "market_cap", "number_of_investors", "title"]
-        )
+        with havuzdan_crawler() as crawler:
+            df = crawler.fetch(
+                start=start_date.strftime("%Y-%m-%d"),
+                end=end_date.strftime("%Y-%m-%d"),
+                name=fon_kodu,
+                columns=["date", "price", "market_cap", "number_of_investors", "title"]
+            )
         if df.empty:
             return fon_kodu, None, None
         
         df['date'] = pd.to_datetime(df['date'], errors='coerce').dt.date
         fon_adi = df['title'].iloc[0] if not df.empty and 'title' in df.columns else fon_kodu
-        return fon_kodu, fon_adi, df.sort_values(by='date').reset_index(drop=True)
+        return fon_kodu, fon_adi, df
     except Exception as e:
         print(f"HATA ({fon_kodu}): Veri çekilirken sorun oluştu - {e}")
         return fon_kodu, None, None
@@ -93,20 +99,55 @@ def hesapla_metrikler(df_fon_fiyat):
         'Yatırımcı Sayısı': df_fon_fiyat['number_of_investors'].iloc[-1]
     }
 
+def excel_dosyasina_yaz(df_sonuc_sirali, excel_dosya_adi, sayfa_adi='Analiz Sonuclari', ek_sayfalar=None):
+    """
+    Sonuç tablosunu (ve varsa {sayfa_adi: DataFrame} olarak verilen ek
+    tabloları) sütunları otomatik boyutlandırılmış bir Excel dosyasına yazar.
+    """
+    print(f"\nAnaliz tamamlandı. Sonuçlar '{excel_dosya_adi}' dosyasına yazılıyor...")
+    
+    try:
+        with pd.ExcelWriter(excel_dosya_adi, engine='xlsxwriter') as writer:
+            for ad, df in {sayfa_adi: df_sonuc_sirali, **(ek_sayfalar or {})}.items():
+                df.to_excel(writer, sheet_name=ad, index=False)
+                worksheet = writer.sheets[ad]
+                for i, col in enumerate(df.columns):
+                    column_len = max(df[col].astype(str).map(len).max(), len(col)) + 2
+                    worksheet.set_column(i, i, column_len)
+        print(f"'{excel_dosya_adi}' dosyası başarıyla oluşturuldu.")
+    except Exception as e:
+        print(f"HATA: Excel dosyası oluşturulurken bir sorun oluştu: {e}")
+
 def main():
     """
     Ana fonksiyon: fon listesini okur, verileri çeker, analiz eder ve sonucu Excel'e yazar.
+
+    'coklu' argümanı ile çalıştırıldığında (python analiz_script.py coklu),
+    en uzun dönem için veri bir kez çekilir ve ANALIZ_UFUKLARI_AY'daki tüm
+    dönemlerin metrikleri tek bir geniş tabloya yazılır.
+    '--category=hisse_yogun,hisse' seçeneği listeyi verilen kategorilerle sınırlar.
+    '--portfoy' seçeneği sıralanan fonlardan portföy ağırlıklarını hesaplar ve
+    ayrı bir Excel dosyasına yazar.
     """
     print("--- Fonaliz Dinamik Analiz Script'i Başlatıldı ---")
     start_time = time.time()
+    secenekler = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+    argumanlar = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    coklu_donem = len(argumanlar) > 0 and argumanlar[0].lower() == 'coklu'
+    kategoriler = kategori_secenegini_oku(secenekler)
+    portfoy = '--portfoy' in secenekler
     
     fon_listesi = load_filtered_fund_list()
+    if kategoriler:
+        fon_listesi = kategoriye_gore_filtrele(pd.DataFrame({'Fon Kodu': fon_listesi}), kategoriler)['Fon Kodu'].tolist()
     
     end_date = date.today()
-    start_date = end_date - relativedelta(months=ANALIZ_SURESI_AY)
+    analiz_suresi_ay = max(ANALIZ_UFUKLARI_AY) if coklu_donem else ANALIZ_SURESI_AY
+    start_date = end_date - relativedelta(months=analiz_suresi_ay)
     
     tasks = [(fon_kodu, start_date, end_date) for fon_kodu in fon_listesi]
     analiz_sonuclari = []
+    ham_gecmisler, fon_adlari = {}, {}
 
     print(f"\n{len(fon_listesi)} adet fon için {start_date.strftime('%Y-%m-%d')} - {end_date.strftime('%Y-%m-%d')} tarih aralığında analiz başlatılıyor...")
 
@@ -116,33 +157,48 @@ def main():
         for future in concurrent.futures.as_completed(future_to_fon):
             fon_kodu, fon_adi, data = future.result()
             if data is not None:
-                metrikler = hesapla_metrikler(data)
-                if metrikler:
-                    sonuc = {'Fon Kodu': fon_kodu, 'Fon Adı': fon_adi, **metrikler}
-                    analiz_sonuclari.append(sonuc)
+                ham_gecmisler[fon_kodu], fon_adlari[fon_kodu] = data, fon_adi
+
+    # Tüm fonlar tek seferde temizlenir: sıralı, tekil tarihler ve geçerli fiyatlar
+    fon_gecmisleri, _ = gecmisleri_temizle(ham_gecmisler)
+
+    for fon_kodu, data in fon_gecmisleri.items():
+        if coklu_donem:
+            metrikler = hesapla_cok_donemli_metrikler(data, end_date, ANALIZ_UFUKLARI_AY)
+        else:
+            metrikler = hesapla_metrikler(data)
+        if metrikler:
+            sonuc = {'Fon Kodu': fon_kodu, 'Fon Adı': fon_adlari[fon_kodu], **metrikler}
+            analiz_sonuclari.append(sonuc)
 
     if not analiz_sonuclari:
         print("\n--- SONUÇ: Analiz edilecek yeterli veri bulunamadı. ---")
         return
 
     df_sonuc = pd.DataFrame(analiz_sonuclari)
-    sutun_sirasi = ['Fon Kodu', 'Fon Adı', 'Yatırımcı Sayısı', 'Piyasa Değeri (TL)', 'Sortino Oranı (Yıllık)', 'Sharpe Oranı (Yıllık)', 'Getiri (%)', 'Standart Sapma (Yıllık %)']
+    if coklu_donem:
+        sutun_sirasi = cok_donemli_sutun_sirasi(ANALIZ_UFUKLARI_AY)
+        ana_ufuk = ANALIZ_SURESI_AY if ANALIZ_SURESI_AY in ANALIZ_UFUKLARI_AY else max(ANALIZ_UFUKLARI_AY)
+        siralama = [ufuk_sutun_adlari(ana_ufuk)['sortino'], ufuk_sutun_adlari(ana_ufuk)['sharpe']]
+        excel_dosya_adi = f"Fonaliz_Cok_Donemli_Sonuclari_{end_date.strftime('%Y-%m-%d')}.xlsx"
+    else:
+        sutun_sirasi = ['Fon Kodu', 'Fon Adı', 'Yatırımcı Sayısı', 'Piyasa Değeri (TL)', 'Sortino Oranı (Yıllık)', 'Sharpe Oranı (Yıllık)', 'Getiri (%)', 'Standart Sapma (Yıllık %)']
+        siralama = ['Sortino Oranı (Yıllık)', 'Sharpe Oranı (Yıllık)']
+        excel_dosya_adi = f"Fonaliz_Sonuclari_{end_date.strftime('%Y-%m-%d')}.xlsx"
     df_sonuc = df_sonuc[sutun_sirasi]
-    df_sonuc_sirali = df_sonuc.sort_values(by=['Sortino Oranı (Yıllık)', 'Sharpe Oranı (Yıllık)'], ascending=[False, False])
+    df_sonuc_sirali = df_sonuc.sort_values(by=siralama, ascending=[False, False], na_position='last')
 
-    excel_dosya_adi = f"Fonaliz_Sonuclari_{end_date.strftime('%Y-%m-%d')}.xlsx"
-    print(f"\nAnaliz tamamlandı. Sonuçlar '{excel_dosya_adi}' dosyasına yazılıyor...")
-    
-    try:
-        with pd.ExcelWriter(excel_dosya_adi, engine='xlsxwriter') as writer:
-            df_sonuc_sirali.to_excel(writer, sheet_name='Analiz Sonuclari', index=False)
-            worksheet = writer.sheets['Analiz Sonuclari']
-            for i, col in enumerate(df_sonuc_sirali.columns):
-                column_len = max(df_sonuc_sirali[col].astype(str).map(len).max(), len(col)) + 2
-                worksheet.set_column(i, i, column_len)
-        print(f"'{excel_dosya_adi}' dosyası başarıyla oluşturuldu.")
-    except Exception as e:
-        print(f"HATA: Excel dosyası oluşturulurken bir sorun oluştu: {e}")
+    excel_dosyasina_yaz(df_sonuc_sirali, excel_dosya_adi)
+    sonucu_kaydet('fonaliz_coklu' if coklu_donem else 'fonaliz', df_sonuc_sirali)
+
+    if portfoy:
+        df_agirliklar, df_ozet = kisa_liste_portfoyleri(fon_gecmisleri, df_sonuc_sirali['Fon Kodu'].tolist(), fon_adlari)
+        if not df_agirliklar.empty:
+            excel_dosyasina_yaz(df_agirliklar, f"Fonaliz_Portfoy_{end_date.strftime('%Y-%m-%d')}.xlsx",
+                                sayfa_adi='Portfoy Agirliklari', ek_sayfalar={'Etkin Sinir': df_ozet})
+            sonucu_kaydet('portfoy_agirliklari', df_agirliklar)
+            sonucu_kaydet('portfoy_ozeti', df_ozet)
+    calisma_tamamlandi('analiz')
 
     end_time = time.time()
     print(f"\n--- Tüm işlemler {end_time - start_time:.2f} saniyede tamamlandı ---")
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# Fonaliz - İş Parçacığı Bazlı TEFAS Crawler Havuzu
+# Her işçi iş parçacığı (thread) için tek bir Crawler (ve dolayısıyla tek bir
+# keep-alive HTTP oturumu) oluşturur ve bu oturumu o iş parçacığının tüm
+# görevlerinde yeniden kullanır. Böylece her fon için yeni TCP/TLS bağlantısı
+# kurulmaz; Crawler nesneleri de iş parçacıkları arasında paylaşılmaz.
+# Her aşama kendi ThreadPoolExecutor'ını açtığından, biten iş parçacıklarının
+# oturumları bir sonraki crawler_al() çağrısında geri alınır ve yeni iş
+# parçacıklarına verilir; böylece ısıtılmış oturumlar aşamalar arasında da
+# kullanılır ve açık oturum sayısı aynı anda çalışan iş parçacığı sayısını
+# aşmaz. Bir istek hata verdiğinde o iş parçacığının oturumu kapatılıp yenilenir.
+
+import threading
+from contextlib import contextmanager
+
+from requests.adapters import HTTPAdapter
+from tefas import Crawler
+
+# --- AYARLAR ---
+HAVUZ_ISINMA = True # Yeni oturum açıldığında TEFAS'a bağlantı kurup çerezleri almak için ön istek
+HAVUZ_ISINMA_TIMEOUT = 10 # Isınma isteği için zaman aşımı (saniye)
+HAVUZ_BAGLANTI_SAYISI = 4 # Oturum başına açık tutulacak keep-alive bağlantı sayısı
+
+_sahipler = {} # İş parçacığı -> o iş parçacığının crawler'ı
+_bostakiler = [] # Biten iş parçacıklarından geri alınan, yeniden verilecek crawler'lar
+_kilit = threading.Lock()
+
+
+def _yeni_crawler():
+    crawler = Crawler()
+    session = getattr(crawler, 'session', None)
+    if session is not None:
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HAVUZ_BAGLANTI_SAYISI)
+        session.mount('https://', adapter)
+        if HAVUZ_ISINMA:
+            try:
+                session.get(crawler.root_url, timeout=HAVUZ_ISINMA_TIMEOUT)
+            except Exception:
+                pass # Isınma başarısız olsa da ilk gerçek istekte bağlantı kurulur
+    return crawler
+
+
+def _crawler_kapat(crawler):
+    session = getattr(crawler, 'session', None)
+    if session is not None:
+        try:
+            session.close()
+        except Exception:
+            pass
+
+
+def crawler_al():
+    """
+    Çağıran iş parçacığına ait Crawler'ı döndürür. Yoksa önce biten iş
+    parçacıklarından geri alınan bir Crawler verilir; o da yoksa yenisi
+    oluşturulup ısıtılır.
+    """
+    is_parcacigi = threading.current_thread()
+    with _kilit:
+        crawler = _sahipler.get(is_parcacigi)
+        if crawler is not None:
+            return crawler
+        for bitmis in [t for t in _sahipler if not t.is_alive()]:
+            _bostakiler.append(_sahipler.pop(bitmis))
+        crawler = _bostakiler.pop() if _bostakiler else None
+    if crawler is None:
+        crawler = _yeni_crawler()
+    with _kilit:
+        _sahipler[is_parcacigi] = crawler
+    return crawler
+
+
+def crawler_yenile():
+    """
+    Çağıran iş parçacığının Crawler'ını kapatır; bir sonraki crawler_al()
+    çağrısında yeni bir oturum açılır.
+    """
+    with _kilit:
+        crawler = _sahipler.pop(threading.current_thread(), None)
+    if crawler is not None:
+        _crawler_kapat(crawler)
+
+
+@contextmanager
+def havuzdan_crawler():
+    """
+    İş parçacığının Crawler'ını verir. Blok içinde hata oluşursa oturum
+    yenilenir ve hata çağırana iletilir.
+
+    Kullanım:
+        with havuzdan_crawler() as crawler:
+            df = crawler.fetch(...)
+    """
+    crawler = crawler_al()
+    try:
+        yield crawler
+    except Exception:
+        crawler_yenile()
+        raise
+
+
+def havuzu_kapat():
+    """
+    Açılmış tüm oturumları kapatır. Uzun süre çalışan süreçlerin kapanışında
+    kullanılır.
+    """
+    with _kilit:
+        crawlerlar = list(_sahipler.values()) + _bostakiler
+        _sahipler.clear()
+        _bostakiler.clear()
+    for crawler in crawlerlar:
+        _crawler_kapat(crawler)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# Fonaliz - Getiri Korelasyonu ile Benzer Fon Kümeleme
+# Bu modül, taranan tüm fonların günlük getirilerini tarih bazında hizalar,
+# tüm fon çiftleri arasındaki korelasyonu bloklu matris çarpımlarıyla hesaplar
+# ve eşiğin üzerinde korelasyona sahip fonları (besleyici fonlar, sınıf
+# varyantları, aynı yöneticinin ikiz fonları) aynı kümede toplar.
+
+import numpy as np
+import pandas as pd
+
+# --- AYARLAR ---
+KUMELEME_KORELASYON_ESIGI = 0.95 # Bu değerin üzerindeki çiftler aynı kümeye girer
+KORELASYON_BLOK_BOYUTU = 256 # Her matris çarpımında işlenen fon sayısı
+MIN_ORTAK_GOZLEM = 20 # Korelasyon hesaplamak için gereken ortak gün sayısı
+
+
+def getiri_matrisi_olustur(fon_gecmisleri: dict):
+    """
+    {fon_kodu: fiyat geçmişi} sözlüğünden tarih x fon biçiminde hizalanmış
+    günlük getiri matrisini oluşturur. Bir fonun işlem görmediği günler NaN kalır.
+    Geçmişlerin gecmisleri_temizle ile temizlenmiş olduğu varsayılır.
+    """
+    parcalar = [df[['date', 'price']].assign(code=fon_kodu)
+                for fon_kodu, df in fon_gecmisleri.items() if df is not None and not df.empty]
+    if not parcalar:
+        return pd.DataFrame()
+
+    uzun = pd.concat(parcalar, ignore_index=True)
+    fiyatlar = uzun.pivot(index='date', columns='code', values='price').sort_index()
+    return fiyatlar.pct_change(fill_method=None).iloc[1:]
+
+
+def _korelasyon_bloklari(getiri_matrisi: np.ndarray, blok_boyutu: int):
+    """
+    Eksik gözlemleri dışarıda bırakarak (pandas .corr ile aynı şekilde, çift
+    bazında ortak günler üzerinden) korelasyon matrisini üst üçgen bloklar
+    halinde üretir. Her blok, toplamların BLAS matris çarpımlarıyla hesaplanır.
+    """
+    maske = ~np.isnan(getiri_matrisi)
+    x = np.where(maske, getiri_matrisi, 0.0)
+    x_kare = x * x
+    m = maske.astype(float)
+    fon_sayisi = getiri_matrisi.shape[1]
+
+    for i in range(0, fon_sayisi, blok_boyutu):
+        a = slice(i, min(i + blok_boyutu, fon_sayisi))
+        for j in range(i, fon_sayisi, blok_boyutu):
+            b = slice(j, min(j + blok_boyutu, fon_sayisi))
+            ortak = m[:, a].T @ m[:, b]
+            sx, sy = x[:, a].T @ m[:, b], m[:, a].T @ x[:, b]
+            sxx, syy = x_kare[:, a].T @ m[:, b], m[:, a].T @ x_kare[:, b]
+            sxy = x[:, a].T @ x[:, b]
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                kovaryans = ortak * sxy - sx * sy
+                korelasyon = kovaryans / np.sqrt((ortak * sxx - sx ** 2) * (ortak * syy - sy ** 2))
+            yield a, b, ortak, korelasyon
+
+
+def kumeleri_bul(getiri_matrisi: pd.DataFrame, esik: float = KUMELEME_KORELASYON_ESIGI,
+                 blok_boyutu: int = KORELASYON_BLOK_BOYUTU, min_ortak_gozlem: int = MIN_ORTAK_GOZLEM):
+    """
+    Korelasyonu eşiğin üzerinde olan fonları birleşim-bul (union-find) ile
+    kümeler. Birden fazla fon içeren kümeler, büyükten küçüğe sıralı olarak
+    fon kodu listeleri halinde döndürülür.
+    """
+    if getiri_matrisi.empty:
+        return []
+
+    fon_kodlari = list(getiri_matrisi.columns)
+    ebeveyn = list(range(len(fon_kodlari)))
+
+    def kok(i):
+        while ebeveyn[i] != i:
+            ebeveyn[i] = ebeveyn[ebeveyn[i]]
+            i = ebeveyn[i]
+        return i
+
+    for a, b, ortak, korelasyon in _korelasyon_bloklari(getiri_matrisi.to_numpy(dtype=float), blok_boyutu):
+        gecerli = (ortak >= min_ortak_gozlem) & (korelasyon >= esik)
+        if a.start == b.start:
+            gecerli &= np.triu(np.ones_like(gecerli, dtype=bool), k=1)
+        for i, j in zip(*np.nonzero(gecerli)):
+            kok_i, kok_j = kok(a.start + i), kok(b.start + j)
+            if kok_i != kok_j:
+                ebeveyn[kok_j] = kok_i
+
+    kumeler = {}
+    for i, fon_kodu in enumerate(fon_kodlari):
+        kumeler.setdefault(kok(i), []).append(fon_kodu)
+    return sorted([k for k in kumeler.values() if len(k) > 1], key=len, reverse=True)
+
+
+def temsilcileri_sec(kumeler: list, skorlar: pd.Series):
+    """
+    Her kümeden skoru en yüksek fonu temsilci olarak seçer.
+    {temsilci_fon_kodu: küme üyeleri} sözlüğü döndürür.
+    """
+    temsilciler = {}
+    for kume in kumeler:
+        kume_skorlari = skorlar.reindex(kume)
+        temsilci = kume_skorlari.idxmax() if kume_skorlari.notna().any() else kume[0]
+        temsilciler[temsilci] = kume
+    return temsilciler
+
+
+def kume_temsilcilerine_indir(fon_listesi: list, kumeler: list, skorlar: pd.Series):
+    """
+    Fon listesinde aynı kümeden birden fazla fon varsa, yalnızca listedekiler
+    arasında skoru en yüksek olanı bırakır. Listenin sırası korunur.
+    """
+    fon_kumesi = {fon_kodu: k for k, kume in enumerate(kumeler) for fon_kodu in kume}
+    listedekiler = {}
+    for fon_kodu in fon_listesi:
+        if fon_kodu in fon_kumesi:
+            listedekiler.setdefault(fon_kumesi[fon_kodu], []).append(fon_kodu)
+
+    elenecekler = set()
+    for uyeler in listedekiler.values():
+        temsilci = next(iter(temsilcileri_sec([uyeler], skorlar)))
+        elenecekler.update(f for f in uyeler if f != temsilci)
+    return [fon_kodu for fon_kodu in fon_listesi if fon_kodu not in elenecekler]
+
+
+def kume_raporu_yaz(kumeler: list, skorlar: pd.Series, dosya_adi: str, fon_adlari: dict = None,
+                    esik: float = KUMELEME_KORELASYON_ESIGI):
+    """
+    Bulunan kümeleri ve her kümenin temsilcisini bir metin dosyasına yazar.
+    """
+    fon_adlari = fon_adlari or {}
+    with open(dosya_adi, 'w', encoding='utf-8') as f:
+        f.write("--- Benzer Fon Kümeleri ---\n")
+        f.write(f"Korelasyon eşiği: {esik}\n")
+        f.write(f"Toplam {len(kumeler)} küme, {sum(len(k) for k in kumeler)} fon.\n")
+        f.write("---------------------------------\n")
+        for no, (temsilci, kume) in enumerate(temsilcileri_sec(kumeler, skorlar).items(), start=1):
+            f.write(f"\nKüme {no} ({len(kume)} fon) - Temsilci: {temsilci}\n")
+            for fon_kodu in kume:
+                isaret = '*' if fon_kodu == temsilci else '-'
+                f.write(f"  {isaret} {fon_kodu} ({fon_adlari.get(fon_kodu, fon_kodu)})\n")
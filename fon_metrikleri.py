@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# Fonaliz - Çok Dönemli Risk Metrikleri
+# Bu modül, tek seferde çekilen en uzun fiyat geçmişinden 1, 3, 6 ve 12 aylık
+# (veya istenen diğer) dönemler için risk/getiri metriklerini hesaplar.
+# Her dönem için veriyi yeniden çekmek ya da yeniden hesaplamak yerine
+# getiri ve getiri karelerinin kümülatif toplamları kullanılır.
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+# --- AYARLAR ---
+VARSAYILAN_UFUKLAR_AY = [1, 3, 6, 12]
+MIN_GOZLEM_SAYISI = 10 # hesapla_metrikler ile aynı alt sınır
+YILLIK_ISLEM_GUNU = 252
+
+
+def ufuk_sutun_adlari(ufuk_ay):
+    """
+    Verilen dönem için geniş tabloda kullanılacak sütun adlarını döndürür.
+    """
+    return {
+        'getiri': f'Getiri ({ufuk_ay} Ay %)',
+        'volatilite': f'Standart Sapma ({ufuk_ay} Ay, Yıllık %)',
+        'sharpe': f'Sharpe Oranı ({ufuk_ay} Ay)',
+        'sortino': f'Sortino Oranı ({ufuk_ay} Ay)',
+        'max_dusus': f'Maks. Düşüş ({ufuk_ay} Ay %)',
+    }
+
+
+def hesapla_cok_donemli_metrikler(df_fon_fiyat, bitis_tarihi, ufuklar_ay=VARSAYILAN_UFUKLAR_AY):
+    """
+    Bir fonun fiyat geçmişinden tüm dönemler için metrikleri tek geçişte hesaplar.
+
+    Günlük getiriler, getiri kareleri ve negatif getiriler için önek (prefix)
+    toplamları bir kez hesaplanır; her dönemin ortalama ve standart sapması bu
+    toplamların farkından elde edilir. Maksimum düşüş için ters yönde tek bir
+    kümülatif minimum/maksimum geçişi yapılır; böylece her başlangıç noktası
+    için düşüş değeri aynı anda bulunur.
+    Yeterli gözlemi olmayan dönemler NaN olarak bırakılır.
+    Geçmişin gecmisleri_temizle ile temizlenmiş (tarihe göre sıralı, tekil
+    tarihli, pozitif fiyatlı) olduğu varsayılır.
+    """
+    if df_fon_fiyat is None or len(df_fon_fiyat) < MIN_GOZLEM_SAYISI: return None
+
+    tarihler = pd.to_datetime(df_fon_fiyat['date']).values.astype('datetime64[D]')
+    fiyatlar = df_fon_fiyat['price'].to_numpy(dtype=float)
+    n = len(fiyatlar)
+
+    # r[k], k. fiyattan k+1. fiyata olan getiri
+    getiriler = fiyatlar[1:] / fiyatlar[:-1] - 1
+    negatif = getiriler < 0
+    negatif_getiriler = np.where(negatif, getiriler, 0.0)
+
+    def onek(dizi):
+        return np.concatenate(([0.0], np.cumsum(dizi)))
+
+    s_toplam, s_kare = onek(getiriler), onek(getiriler ** 2)
+    n_sayi, n_toplam, n_kare = onek(negatif), onek(negatif_getiriler), onek(negatif_getiriler ** 2)
+
+    # Her başlangıç indeksi i için, i'den sonuna kadar olan maksimum düşüş
+    sonek_min = np.minimum.accumulate(fiyatlar[::-1])[::-1]
+    max_dusus_sonek = np.maximum.accumulate((1 - sonek_min / fiyatlar)[::-1])[::-1]
+
+    ufuklar = np.asarray(ufuklar_ay)
+    baslangiclar = np.array([np.datetime64(bitis_tarihi - relativedelta(months=int(ay)), 'D') for ay in ufuklar])
+    son = n - 1
+    # Son fiyattan sonra başlayan dönemler (yayını durmuş ya da verisi gecikmiş
+    # fonlar) için i0 = n olur; önek dizileri bu indekse sahip değildir.
+    # Bu dönemler aşağıda yeterli gözlem olmadığından NaN bırakılır.
+    i0 = np.minimum(np.searchsorted(tarihler, baslangiclar, side='left'), son)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m = (son - i0).astype(float) # dönemdeki getiri sayısı
+        ortalama = (s_toplam[son] - s_toplam[i0]) / m
+        varyans = np.clip((s_kare[son] - s_kare[i0] - m * ortalama ** 2) / (m - 1), 0, None)
+        std = np.sqrt(varyans)
+
+        nm = n_sayi[son] - n_sayi[i0]
+        n_ortalama = (n_toplam[son] - n_toplam[i0]) / nm
+        n_varyans = np.clip((n_kare[son] - n_kare[i0] - nm * n_ortalama ** 2) / (nm - 1), 0, None)
+        downside_deviation = np.sqrt(n_varyans) * np.sqrt(YILLIK_ISLEM_GUNU)
+
+        getiri = fiyatlar[son] / fiyatlar[i0] - 1
+        volatilite = std * np.sqrt(YILLIK_ISLEM_GUNU)
+        sharpe = np.where(std > 0, ortalama / std * np.sqrt(YILLIK_ISLEM_GUNU), 0.0)
+        sortino = np.where((nm > 1) & (downside_deviation > 0), ortalama * YILLIK_ISLEM_GUNU / downside_deviation, 0.0)
+    max_dusus = max_dusus_sonek[i0]
+
+    yeterli = (son - i0 + 1) >= MIN_GOZLEM_SAYISI
+    sonuc = {}
+    for j, ay in enumerate(ufuklar):
+        adlar = ufuk_sutun_adlari(int(ay))
+        if not yeterli[j]:
+            for ad in adlar.values(): sonuc[ad] = np.nan
+            continue
+        sonuc[adlar['getiri']] = round(getiri[j] * 100, 2)
+        sonuc[adlar['volatilite']] = round(volatilite[j] * 100, 2)
+        sonuc[adlar['sharpe']] = round(sharpe[j], 2)
+        sonuc[adlar['sortino']] = round(sortino[j], 2)
+        sonuc[adlar['max_dusus']] = round(max_dusus[j] * 100, 2)
+
+    sonuc['Piyasa Değeri (TL)'] = df_fon_fiyat['market_cap'].iloc[-1] if 'market_cap' in df_fon_fiyat.columns else np.nan
+    sonuc['Yatırımcı Sayısı'] = df_fon_fiyat['number_of_investors'].iloc[-1] if 'number_of_investors' in df_fon_fiyat.columns else np.nan
+    return sonuc
+
+
+def cok_donemli_sutun_sirasi(ufuklar_ay=VARSAYILAN_UFUKLAR_AY):
+    """
+    Geniş tablonun sütun sırasını döndürür: önce fon bilgileri, sonra her
+    metrik için kısa dönemden uzun döneme doğru sütunlar.
+    """
+    sira = ['Fon Kodu', 'Fon Adı', 'Yatırımcı Sayısı', 'Piyasa Değeri (TL)']
+    for anahtar in ['sortino', 'sharpe', 'getiri', 'volatilite', 'max_dusus']:
+        sira += [ufuk_sutun_adlari(ay)[anahtar] for ay in ufuklar_ay]
+    return sira
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+# Fonaliz - Kısa Liste Üzerinden Portföy Oluşturma
+# Fonaliz'in sıraladığı fonların hizalanmış günlük getirilerinden kovaryans
+# matrisi bir kez hesaplanır; minimum varyans, maksimum Sharpe ve risk
+# paritesi ağırlıkları ile etkin sınır, fon başına üst sınır senaryolarının
+# tamamı için aynı anda çözülür. Tüm problemler tek bir (problem x fon)
+# ağırlık matrisinde tutulur; her iterasyon tek bir matris çarpımıdır.
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from fon_kumeleme import getiri_matrisi_olustur
+
+# --- AYARLAR ---
+PORTFOY_ADAY_SAYISI = 150 # Fonaliz sıralamasından portföye aday alınan en fazla fon sayısı
+PORTFOY_UST_SINIR_SENARYOLARI = [0.10, 0.20, 0.35] # Fon başına en yüksek ağırlık senaryoları
+PORTFOY_SINIR_NOKTA_SAYISI = 40 # Etkin sınırda çözülen nokta sayısı
+PORTFOY_RISKSIZ_GETIRI = 0.0 # Yıllık; Fonaliz Sharpe oranı ile tutarlı olması için 0
+PORTFOY_KOVARYANS_KUCULTME = 0.2 # Örnek kovaryansın köşegene doğru küçültülme oranı
+PORTFOY_MIN_KAPSAMA = 0.8 # Fonun getirisinin bulunması gereken gün oranı
+PORTFOY_MAKS_ITERASYON = 3000
+PORTFOY_TOLERANS = 1e-8
+PORTFOY_RP_TOLERANS = 1e-4 # Risk paritesinde serbest fonların risk katkılarına izin verilen göreli fark
+PORTFOY_MIN_AGIRLIK_GOSTERIM = 0.0005 # Bu değerin altındaki ağırlıklar özet metnine yazılmaz
+YILLIK_ISLEM_GUNU = 252
+
+
+def kovaryans_ve_getiri(getiri_matrisi: pd.DataFrame, kucultme: float = PORTFOY_KOVARYANS_KUCULTME,
+                        min_kapsama: float = PORTFOY_MIN_KAPSAMA):
+    """
+    Tarih x fon getiri matrisinden yıllık beklenen getiri vektörünü ve
+    kovaryans matrisini hesaplar. Günlerin min_kapsama oranından azında getirisi
+    olan fonlar çıkarılır; kalan eksik günler sıfır getiri kabul edilir.
+    Fon sayısı gözlem sayısına yaklaştığında örnek kovaryans tekil olacağından
+    köşegene doğru küçültülür. (fon_kodlari, beklenen_getiri, kovaryans) döndürür.
+    """
+    kapsama = getiri_matrisi.notna().mean()
+    getiri_matrisi = getiri_matrisi.loc[:, kapsama >= min_kapsama]
+    x = getiri_matrisi.fillna(0.0).to_numpy(dtype=float)
+    if x.shape[0] < 2 or x.shape[1] == 0:
+        return [], np.zeros(0), np.zeros((0, 0))
+
+    beklenen_getiri = x.mean(axis=0) * YILLIK_ISLEM_GUNU
+    merkez = x - x.mean(axis=0)
+    ornek = merkez.T @ merkez / (x.shape[0] - 1) * YILLIK_ISLEM_GUNU
+    kovaryans = (1 - kucultme) * ornek + kucultme * np.diag(np.diag(ornek))
+    return list(getiri_matrisi.columns), beklenen_getiri, kovaryans
+
+
+def _izdusum_tau(v: np.ndarray, ust: np.ndarray, olcek: np.ndarray, tau: np.ndarray = None):
+    """
+    toplam(kırp(v - tau * olcek, 0, ust)) = 1 denklemini her satır için çözer.
+    Toplam tau'nun azalan, parçalı doğrusal bir fonksiyonudur: önce Newton
+    adımı denenir, adım kök aralığının dışına çıkarsa aralık uçlarından kiriş
+    (doğrusal aradeğer) kullanılır; ikisi de doğrusal parça üzerinde tam sonucu
+    verir. Kök aralığı her adımda daralır. Ardışık çağrılarda önceki tau
+    başlangıç değeri olarak verilirse çoğu satır bir iki adımda biter. Tüm
+    satırlar aynı anda işlenir.
+    """
+    alt_tau = ((v - ust) / olcek).min(axis=1, keepdims=True)
+    ust_tau = (v / olcek).max(axis=1, keepdims=True)
+    alt_hata = ust.sum(axis=1, keepdims=True) - 1 # alt_tau'da tüm fonlar üst sınırda
+    ust_hata = np.full(alt_hata.shape, -1.0) # ust_tau'da tüm ağırlıklar sıfır
+    tau = (alt_tau + ust_tau) / 2 if tau is None else np.clip(tau, alt_tau, ust_tau)
+    tolerans = 1e-13 * v.shape[1] * np.maximum(1.0, np.abs(v).max(axis=1, keepdims=True))
+    onceki_fazla = None
+    for _ in range(100):
+        fark = v - tau * olcek
+        hata = np.clip(fark, 0.0, ust).sum(axis=1, keepdims=True) - 1
+        bitti = np.abs(hata) <= tolerans
+        if bitti.all():
+            break
+        fazla = hata > 0
+        alt_tau, alt_hata = np.where(fazla, tau, alt_tau), np.where(fazla, hata, alt_hata)
+        ust_tau, ust_hata = np.where(fazla, ust_tau, tau), np.where(fazla, ust_hata, hata)
+        # Aralığın aynı ucu üst üste güncellenirse kirişin takılmaması için
+        # diğer uçtaki değer yarıya indirilir (Illinois yöntemi)
+        ayni_taraf = fazla == onceki_fazla
+        alt_hata = np.where(ayni_taraf & ~fazla, alt_hata / 2, alt_hata)
+        ust_hata = np.where(ayni_taraf & fazla, ust_hata / 2, ust_hata)
+        onceki_fazla = fazla
+        egim = np.where((fark > 0) & (fark < ust), olcek, 0.0).sum(axis=1, keepdims=True)
+        newton = tau + hata / np.maximum(egim, 1e-300)
+        kiris = alt_tau + alt_hata * (ust_tau - alt_tau) / np.maximum(alt_hata - ust_hata, 1e-300)
+        yeni_tau = np.where((egim > 0) & (newton > alt_tau) & (newton < ust_tau), newton,
+                            np.where((kiris > alt_tau) & (kiris < ust_tau), kiris, (alt_tau + ust_tau) / 2))
+        tau = np.where(bitti, tau, yeni_tau)
+    return tau
+
+
+def _sinirli_simplekse_izdusur(v: np.ndarray, ust: np.ndarray):
+    """
+    Her satırı {w : toplam(w) = 1, 0 <= w <= ust} kümesine Öklid izdüşümüyle taşır.
+    """
+    olcek = np.ones((1, v.shape[1]))
+    return np.clip(v - _izdusum_tau(v, ust, olcek) * olcek, 0.0, ust)
+
+
+def _karesel_coz(kovaryans: np.ndarray, dogrusal: np.ndarray, ust: np.ndarray):
+    """
+    Her satır k için min 1/2 w'Σw - dogrusal[k]'w problemini sınırlı simplekste
+    hızlandırılmış izdüşümlü gradyan (FISTA) ile çözer. Tüm problemler aynı
+    kovaryansı paylaştığından her iterasyon tek bir matris çarpımıdır.
+    Oynaklıkları çok farklı fonlar (para piyasası ve hisse fonları gibi) aynı
+    listede olabildiğinden adımlar kovaryansın köşegeniyle ölçeklenir ve
+    izdüşüm aynı ölçekte yapılır. İlerlemesi tersine dönen satırlarda ivme
+    sıfırlanır (uyarlamalı yeniden başlatma).
+    """
+    olcek = 1.0 / np.diag(kovaryans)[None, :]
+    kok_olcek = np.sqrt(olcek)
+    adim = 1.0 / np.linalg.eigvalsh(kok_olcek.T * kovaryans * kok_olcek)[-1]
+    w = _sinirli_simplekse_izdusur(np.full(dogrusal.shape, 1.0 / dogrusal.shape[1]), ust)
+    y, t, tau = w, np.ones((dogrusal.shape[0], 1)), None
+    for _ in range(PORTFOY_MAKS_ITERASYON):
+        v = y - adim * olcek * (y @ kovaryans - dogrusal)
+        tau = _izdusum_tau(v, ust, olcek, tau)
+        w_yeni = np.clip(v - tau * olcek, 0.0, ust)
+        yeniden_baslat = ((y - w_yeni) * (w_yeni - w)).sum(axis=1, keepdims=True) > 0
+        t = np.where(yeniden_baslat, 1.0, t)
+        t_yeni = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = w_yeni + ((t - 1) / t_yeni) * (w_yeni - w)
+        degisim = np.abs(w_yeni - w).max()
+        w, t = w_yeni, t_yeni
+        if degisim < PORTFOY_TOLERANS:
+            break
+    return w
+
+
+def _en_yuksek_getiri(beklenen_getiri: np.ndarray, ust: np.ndarray):
+    """
+    Sınırlı simplekste beklenen getiriyi en yükseğe çıkaran (etkin sınırın uç
+    noktası) ağırlıkları bulur: fonlar getiriye göre sıralanıp üst sınırlarına
+    kadar doldurulur.
+    """
+    sira = np.argsort(-beklenen_getiri)
+    sirali_ust = ust[:, sira]
+    onceki_toplam = np.cumsum(sirali_ust, axis=1) - sirali_ust
+    w = np.zeros_like(ust)
+    w[:, sira] = np.clip(1 - onceki_toplam, 0.0, sirali_ust)
+    return w
+
+
+def _risk_butcesi_coz(kovaryans: np.ndarray, w: np.ndarray, b: np.ndarray, serbest: np.ndarray):
+    """
+    Her satır için serbest fonlarda 1/2 w'Σw - b * toplam(log w_i) fonksiyonunu
+    en küçükler (sabit fonlar değişmez). Minimumda her serbest fon için
+    w_i * (Σw)_i = b olur. Fonksiyon pozitif tanımlı her Σ için kesin dışbükey
+    ve kendinden uyumludur (self-concordant); Newton adımları 1 / (1 + λ)
+    ile sönümlendiğinde (λ: Newton azalması) ağırlıklar pozitif kalır ve
+    yöntem her başlangıç noktasından yakınsar. Tüm satırların Newton
+    sistemleri tek bir toplu çözümle çözülür.
+    """
+    b = b[:, None]
+    ikili_serbest = serbest[:, :, None] & serbest[:, None, :]
+    kosegen_indeksi = np.arange(w.shape[1])
+    for _ in range(PORTFOY_MAKS_ITERASYON):
+        gradyan = np.where(serbest, w @ kovaryans - b / w, 0.0)
+        hessian = np.where(ikili_serbest, kovaryans[None, :, :], 0.0)
+        hessian[:, kosegen_indeksi, kosegen_indeksi] += np.where(serbest, b / (w * w), 1.0)
+        yon = np.linalg.solve(hessian, gradyan[:, :, None])[:, :, 0]
+        azalma = np.sqrt(np.maximum((gradyan * yon).sum(axis=1, keepdims=True), 0.0) / b)
+        adim = np.where(azalma < 0.25, 1.0, 1.0 / (1.0 + azalma))
+        w = w - adim * yon
+        if azalma.max() < 1e-10:
+            break
+    return w
+
+
+def _risk_paritesi(kovaryans: np.ndarray, ust: np.ndarray):
+    """
+    Her fonun portföy riskine katkısını eşitleyen ağırlıkları tüm senaryolar
+    için aynı anda bulur. Sabit bir b için w_i * (Σw)_i = b denklemleri
+    _risk_butcesi_coz ile çözülür; b, serbest fonların toplamı kalan ağırlığa
+    eşit olacak şekilde log-log kiriş adımlarıyla ayarlanır (sabit fon yoksa
+    ağırlıklar b'nin karekökü ile orantılıdır ve ilk adım tam sonucu verir).
+    Üst sınırı aşan fonlar sınıra sabitlenir ve kalan risk bütçesi diğer
+    fonlar arasında yeniden eşitlenir.
+    (agirliklar, yakinsadi) döndürür; yakinsadi, serbest fonların risk
+    katkılarının PORTFOY_RP_TOLERANS içinde eşitlendiği senaryolarda True'dur.
+    """
+    kosegen = np.diag(kovaryans)
+    ters_oynaklik = 1.0 / np.sqrt(kosegen)
+    w = np.tile(ters_oynaklik / ters_oynaklik.sum(), (ust.shape[0], 1))
+    sabit = np.zeros(ust.shape, dtype=bool)
+    for _ in range(ust.shape[1]):
+        w = np.where(sabit, ust, w)
+        serbest = ~sabit
+        bos = ~serbest.any(axis=1) # Tüm fonları sınırda olan senaryolarda çözülecek bir şey kalmaz
+        kalan = 1 - np.where(sabit, ust, 0.0).sum(axis=1)
+        b = (w * (w @ kovaryans)).mean(axis=1)
+        onceki = None
+        for _ in range(100):
+            w = _risk_butcesi_coz(kovaryans, w, b, serbest)
+            toplam = np.where(serbest, w, 0.0).sum(axis=1)
+            if np.abs(np.where(bos, 0.0, toplam - kalan)).max() < PORTFOY_TOLERANS:
+                break
+            # log(toplam), log(b)'ye göre 1/2 (sabit fon yok) ile 1 arasında eğimle artar
+            egim = np.full(b.shape, 0.5)
+            if onceki is not None:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    egim = np.clip(np.log(toplam / onceki[1]) / np.log(b / onceki[0]), 0.25, 1.0)
+                egim = np.where(np.isfinite(egim), egim, 0.5)
+            onceki = (b, toplam)
+            b = np.where(bos, b, b * (kalan / np.maximum(toplam, 1e-300)) ** (1 / egim))
+        yeni_sabit = ~sabit & (w > ust)
+        if not yeni_sabit.any():
+            break
+        sabit |= yeni_sabit
+
+    w = np.minimum(w, ust)
+    katki = w * (w @ kovaryans)
+    en_buyuk = np.where(sabit, -np.inf, katki).max(axis=1)
+    en_kucuk = np.where(sabit, np.inf, katki).min(axis=1)
+    esit = (en_kucuk > 0) & (en_buyuk - en_kucuk < PORTFOY_RP_TOLERANS * en_kucuk)
+    yakinsadi = (np.abs(w.sum(axis=1) - 1) < 1e-6) & (sabit.all(axis=1) | esit)
+    return w, yakinsadi
+
+
+def portfoyleri_hesapla(getiri_matrisi: pd.DataFrame, ust_sinirlar: list = PORTFOY_UST_SINIR_SENARYOLARI,
+                        nokta_sayisi: int = PORTFOY_SINIR_NOKTA_SAYISI, risksiz_getiri: float = PORTFOY_RISKSIZ_GETIRI):
+    """
+    Hizalanmış getiri matrisinden, her üst sınır senaryosu için minimum varyans,
+    maksimum Sharpe ve risk paritesi portföylerini ve etkin sınırı hesaplar.
+
+    Etkin sınır iki toplu çözümle elde edilir: önce getiri ağırlığı geniş bir
+    aralıkta taranır, ardından minimum varyans ile en yüksek getiri arasında eşit
+    aralıklı nokta_sayisi hedef getiri için problemler birlikte çözülür. Maksimum
+    Sharpe portföyü çözülen tüm noktalar arasından Sharpe oranı en yüksek olandır.
+    (agirliklar, ozet) DataFrame'lerini döndürür: agirliklar her fon için
+    strateji ve senaryo başına yüzde ağırlıkları, ozet her portföyün beklenen
+    getirisi, oynaklığı ve Sharpe oranını içerir.
+    """
+    fon_kodlari, mu, kovaryans = kovaryans_ve_getiri(getiri_matrisi)
+    fon_sayisi = len(fon_kodlari)
+    if fon_sayisi == 0:
+        return pd.DataFrame(), pd.DataFrame()
+
+    # Üst sınırlar en az 1/fon_sayisi olmalıdır; aksi halde ağırlıklar 1'e tamamlanamaz
+    sinirlar = np.maximum(np.asarray(ust_sinirlar, dtype=float), 1.0 / fon_sayisi)
+    senaryo_sayisi = len(sinirlar)
+
+    def coz(getiri_agirliklari):
+        # (senaryo x nokta) problemlerinin tamamı tek bir çözümde
+        nokta = getiri_agirliklari.shape[1]
+        ust = np.repeat(sinirlar, nokta)[:, None] * np.ones((1, fon_sayisi))
+        w = _karesel_coz(kovaryans, getiri_agirliklari.reshape(-1, 1) * mu[None, :], ust)
+        return w.reshape(senaryo_sayisi, nokta, fon_sayisi)
+
+    # 1. geçiş: getiri ağırlığı, kovaryans ve getiri ölçeklerinden türetilen
+    # geniş bir logaritmik aralıkta taranır.
+    olcek = np.linalg.eigvalsh(kovaryans)[-1] / max(np.abs(mu).max(), 1e-12)
+    kaba_agirliklar = np.concatenate(([0.0], olcek * np.logspace(-6, 3, nokta_sayisi - 1)))
+    kaba = coz(np.tile(kaba_agirliklar, (senaryo_sayisi, 1)))
+    kaba_getiri = np.maximum.accumulate(kaba @ mu, axis=1)
+    uc_nokta = _en_yuksek_getiri(mu, sinirlar[:, None] * np.ones((1, fon_sayisi)))
+
+    # 2. geçiş: min. varyans ile en yüksek getiri arasındaki eşit aralıklı hedef
+    # getirilere karşılık gelen ağırlıklar ilk geçişten aradeğerlenip çözülür.
+    hedefler = np.linspace(kaba_getiri[:, 0], uc_nokta @ mu, nokta_sayisi, axis=1)[:, 1:-1]
+    ince_agirliklar = np.exp(np.array([np.interp(hedefler[s], kaba_getiri[s, 1:], np.log(kaba_agirliklar[1:]))
+                                       for s in range(senaryo_sayisi)]))
+    sinir = np.concatenate([kaba[:, :1], coz(ince_agirliklar), uc_nokta[:, None, :]], axis=1)
+
+    adaylar = np.concatenate([kaba, sinir], axis=1)
+    aday_getiri = adaylar @ mu
+    aday_oynaklik = np.sqrt(np.einsum('snf,fg,sng->sn', adaylar, kovaryans, adaylar))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        aday_sharpe = np.where(aday_oynaklik > 0, (aday_getiri - risksiz_getiri) / aday_oynaklik, -np.inf)
+    maks_sharpe = adaylar[np.arange(senaryo_sayisi), np.argmax(aday_sharpe, axis=1)]
+    risk_paritesi, rp_yakinsadi = _risk_paritesi(kovaryans, sinirlar[:, None] * np.ones((1, fon_sayisi)))
+    for s in np.flatnonzero(~rp_yakinsadi):
+        print(f"❌ Risk paritesi %{sinirlar[s] * 100:.0f} üst sınır senaryosunda yakınsamadı; bu senaryonun risk paritesi sütunu yazılmayacak.")
+
+    stratejiler = {'Min. Varyans': sinir[:, 0], 'Maks. Sharpe': maks_sharpe, 'Risk Paritesi': risk_paritesi}
+    agirliklar = pd.DataFrame({'Fon Kodu': fon_kodlari})
+    ozet_satirlari = []
+
+    def ozet_satiri(strateji, sinir_degeri, w):
+        getiri, oynaklik = float(w @ mu), float(np.sqrt(w @ kovaryans @ w))
+        belirgin = np.argsort(-w)[:int((w >= PORTFOY_MIN_AGIRLIK_GOSTERIM).sum())]
+        return {
+            'Strateji': strateji,
+            'Fon Başına Üst Sınır (%)': round(sinir_degeri * 100, 2),
+            'Beklenen Getiri (Yıllık %)': round(getiri * 100, 2),
+            'Standart Sapma (Yıllık %)': round(oynaklik * 100, 2),
+            'Sharpe Oranı': round((getiri - risksiz_getiri) / oynaklik, 2) if oynaklik > 0 else np.nan,
+            'Fon Sayısı': len(belirgin),
+            'Ağırlıklar': ', '.join(f"{fon_kodlari[i]} %{w[i] * 100:.1f}" for i in belirgin),
+        }
+
+    for s, sinir_degeri in enumerate(sinirlar):
+        for strateji, w in stratejiler.items():
+            if strateji == 'Risk Paritesi' and not rp_yakinsadi[s]:
+                continue
+            agirliklar[f"{strateji} (Üst Sınır %{sinir_degeri * 100:.0f})"] = np.round(w[s] * 100, 2)
+            ozet_satirlari.append(ozet_satiri(strateji, sinir_degeri, w[s]))
+    for s, sinir_degeri in enumerate(sinirlar):
+        for n in range(nokta_sayisi):
+            ozet_satirlari.append(ozet_satiri(f"Etkin Sınır {n + 1}", sinir_degeri, sinir[s, n]))
+
+    return agirliklar, pd.DataFrame(ozet_satirlari)
+
+
+def kisa_liste_portfoyleri(fon_gecmisleri: dict, sirali_fon_kodlari: list, fon_adlari: dict = None,
+                           aday_sayisi: int = PORTFOY_ADAY_SAYISI):
+    """
+    Fonaliz sıralamasındaki ilk aday_sayisi fonun temizlenmiş fiyat
+    geçmişlerinden portföyleri hesaplar. Ağırlık tablosu Fonaliz sırasıyla ve
+    fon adlarıyla birlikte döndürülür. (agirliklar, ozet) döndürür; yeterli
+    fon yoksa iki tablo da boştur.
+    """
+    baslangic = time.time()
+    adaylar = [k for k in sirali_fon_kodlari if k in fon_gecmisleri][:aday_sayisi]
+    if len(adaylar) < 2:
+        print("ℹ️ Portföy oluşturmak için en az iki fonun fiyat geçmişi gerekli. İşlem atlanıyor.")
+        return pd.DataFrame(), pd.DataFrame()
+
+    agirliklar, ozet = portfoyleri_hesapla(getiri_matrisi_olustur({k: fon_gecmisleri[k] for k in adaylar}))
+    if agirliklar.empty:
+        print("ℹ️ Portföy için yeterli ortak getiri verisi bulunamadı. İşlem atlanıyor.")
+        return agirliklar, ozet
+
+    agirliklar = agirliklar.set_index('Fon Kodu').reindex([k for k in adaylar if k in set(agirliklar['Fon Kodu'])]).reset_index()
+    agirliklar.insert(1, 'Fon Adı', agirliklar['Fon Kodu'].map(fon_adlari or {}).fillna(agirliklar['Fon Kodu']))
+    print(f"✅ Portföy optimizasyonu: {len(agirliklar)} fon, {len(PORTFOY_UST_SINIR_SENARYOLARI)} üst sınır senaryosu ve "
+          f"{PORTFOY_SINIR_NOKTA_SAYISI} etkin sınır noktası {time.time() - baslangic:.2f} saniyede çözüldü.")
+    return agirliklar, ozet
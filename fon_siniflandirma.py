@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# Fonaliz - Fon Kategori İndeksi
+# Fon adları (ve varsa Takasbank listesindeki fon türü bilgisi) fon tipini
+# içerir: "HİSSE SENEDİ YOĞUN FON", "PARA PİYASASI", "FON SEPETİ" vb. Bu modül
+# her fonu bu bilgilerden tek bir kategoriye atar ve sonucu çalıştırmalar
+# arasında saklar. Taramalar --category seçeneğiyle yalnızca ilgili
+# kategorilerin fiyat geçmişini çeker.
+
+import hashlib
+import os
+import sys
+
+import pandas as pd
+
+from sonuc_deposu import SONUC_KLASORU, atomik_yaz
+
+# --- AYARLAR ---
+SINIF_INDEKSI_DOSYASI = 'fon_siniflari.csv' # SONUC_KLASORU altında saklanır
+YEDEK_FON_LISTESI = 'Fon_Verileri.csv' # Fon adları için depodaki yedek liste
+# Takasbank listesinde bulunursa fon adına eklenerek sınıflandırmada kullanılan sütunlar
+KATEGORI_META_SUTUNLARI = ['Şemsiye Fon Türü', 'Fon Türü', 'Fon Tipi']
+
+# Sıra önemlidir: bir fon, adının eşleştiği ilk kategoriye atanır.
+# Kalıplar, Türkçe karakterleri ASCII'ye çevrilmiş büyük harfli metinde aranır.
+KATEGORI_KALIPLARI = [
+    ('hisse_yogun', r'HISSE (?:SENEDI )?YOGUN'),
+    ('fon_sepeti', r'FON SEPETI'),
+    ('serbest', r'SERBEST'),
+    ('para_piyasasi', r'PARA PIYASASI'),
+    ('hisse', r'HISSE'),
+    ('kiymetli_maden', r'ALTIN|GUMUS|KIYMETLI MADEN'),
+    ('borclanma', r'BORCLANMA|EUROBOND|KIRA SERTIFIKA|SUKUK|TAHVIL|BONO|KISA VADELI'),
+    ('coklu_varlik', r'COKLU VARLIK'),
+    ('degisken', r'DEGISKEN'),
+    ('katilim', r'KATILIM'),
+]
+DIGER_KATEGORI = 'diger'
+KATEGORILER = [ad for ad, _ in KATEGORI_KALIPLARI] + [DIGER_KATEGORI]
+
+_ASCII_TABLOSU = str.maketrans('İIıŞşĞğÜüÖöÇç', 'IIISSGGUUOOCC')
+
+# İndeksteki her satır, sınıflandırıldığı kalıp tablosunun özetini taşır;
+# KATEGORI_KALIPLARI değiştiğinde kayıtlı kategoriler yeniden hesaplanır.
+KALIP_SURUMU = hashlib.sha1(repr((KATEGORI_KALIPLARI, DIGER_KATEGORI)).encode('utf-8')).hexdigest()[:12]
+INDEKS_SUTUNLARI = ['Fon Kodu', 'Fon Adı', 'Kategori', 'Kalıp Sürümü']
+
+
+def _normalle(metinler: pd.Series):
+    return metinler.fillna('').astype(str).str.translate(_ASCII_TABLOSU).str.upper().str.replace(r'\s+', ' ', regex=True)
+
+
+def siniflandir(df_fonlar: pd.DataFrame):
+    """
+    'Fon Adı' (ve varsa KATEGORI_META_SUTUNLARI) sütunlarından her fonun
+    kategorisini döndürür. Tüm liste için kalıp başına tek bir vektörel arama yapılır.
+    """
+    metin = df_fonlar['Fon Adı'].fillna('').astype(str)
+    for sutun in KATEGORI_META_SUTUNLARI:
+        if sutun in df_fonlar.columns:
+            metin = metin + ' ' + df_fonlar[sutun].fillna('').astype(str)
+    metin = _normalle(metin)
+
+    kategori = pd.Series(DIGER_KATEGORI, index=df_fonlar.index)
+    atanmamis = pd.Series(True, index=df_fonlar.index)
+    for ad, kalip in KATEGORI_KALIPLARI:
+        eslesen = atanmamis & metin.str.contains(kalip, regex=True)
+        kategori[eslesen] = ad
+        atanmamis &= ~eslesen
+    return kategori
+
+
+def sinif_indeksini_yukle(df_fonlar: pd.DataFrame = None):
+    """
+    Kayıtlı kategori indeksini okur; verilen fon listesinde (yoksa depodaki
+    yedek listede) yeni olan ya da adı değişen fonları sınıflandırıp indeksi
+    günceller. İndeks farklı bir KATEGORI_KALIPLARI ile oluşturulmuşsa tüm
+    kayıtlı fonlar yeniden sınıflandırılır. Adı boş olan fonlar boş ad ile
+    saklanır. INDEKS_SUTUNLARI sütunlu bir DataFrame döndürür.
+    """
+    yol = os.path.join(SONUC_KLASORU, SINIF_INDEKSI_DOSYASI)
+    if os.path.exists(yol):
+        indeks = pd.read_csv(yol, encoding='utf-8', dtype=str, keep_default_na=False).reindex(columns=INDEKS_SUTUNLARI, fill_value='')
+    else:
+        indeks = pd.DataFrame(columns=INDEKS_SUTUNLARI)
+
+    mesajlar = []
+    eskimis = indeks['Kalıp Sürümü'] != KALIP_SURUMU
+    if eskimis.any():
+        indeks.loc[eskimis, 'Kategori'] = siniflandir(indeks[eskimis])
+        indeks.loc[eskimis, 'Kalıp Sürümü'] = KALIP_SURUMU
+        mesajlar.append(f"kategori kalıpları değiştiği için {int(eskimis.sum())} kayıtlı fon yeniden sınıflandırıldı")
+
+    if (df_fonlar is None or df_fonlar.empty) and indeks.empty and os.path.exists(YEDEK_FON_LISTESI):
+        df_fonlar = pd.read_csv(YEDEK_FON_LISTESI, encoding='utf-8-sig', dtype=str)
+
+    if df_fonlar is not None and not df_fonlar.empty:
+        df_fonlar = df_fonlar.dropna(subset=['Fon Kodu']).drop_duplicates(subset=['Fon Kodu'], keep='last').copy()
+        df_fonlar['Fon Kodu'] = df_fonlar['Fon Kodu'].astype(str).str.strip().str.upper()
+        df_fonlar['Fon Adı'] = df_fonlar['Fon Adı'].fillna('').astype(str).str.strip()
+        onceki = indeks.set_index('Fon Kodu')['Fon Adı']
+        degisen = df_fonlar['Fon Adı'].ne(df_fonlar['Fon Kodu'].map(onceki))
+        if degisen.any():
+            yeni = df_fonlar[degisen]
+            yeni = pd.DataFrame({'Fon Kodu': yeni['Fon Kodu'], 'Fon Adı': yeni['Fon Adı'], 'Kategori': siniflandir(yeni),
+                                 'Kalıp Sürümü': KALIP_SURUMU})
+            indeks = pd.concat([indeks[~indeks['Fon Kodu'].isin(yeni['Fon Kodu'])], yeni], ignore_index=True)
+            mesajlar.append(f"{len(yeni)} fon sınıflandırıldı")
+    if not mesajlar:
+        return indeks
+
+    indeks = indeks.sort_values(by='Fon Kodu').reset_index(drop=True)
+    try:
+        atomik_yaz(SINIF_INDEKSI_DOSYASI, lambda y: indeks.to_csv(y, index=False, encoding='utf-8'))
+        print(f"ℹ️ Kategori indeksi güncellendi: {', '.join(mesajlar)}, toplam {len(indeks)} fon.")
+    except Exception as e:
+        print(f"❌ Hata: Kategori indeksi kaydedilemedi: {e}")
+    return indeks
+
+
+def kategoriye_gore_filtrele(df_fonlar: pd.DataFrame, kategoriler: list):
+    """
+    Fon listesini verilen kategorilere indirger. Listede 'Fon Adı' sütunu
+    yoksa kayıtlı indeks kullanılır; indekste bulunmayan (ör. yedek listeden
+    yeni) fonların kategorisi bilinmediğinden bu fonlar atılmaz, listede
+    bırakılır ve sayısı yazdırılır. kategoriler boşsa liste olduğu gibi döndürülür.
+    """
+    if not kategoriler or df_fonlar.empty:
+        return df_fonlar
+    indeks = sinif_indeksini_yukle(df_fonlar if 'Fon Adı' in df_fonlar.columns else None)
+    kategori = df_fonlar['Fon Kodu'].map(indeks.set_index('Fon Kodu')['Kategori'])
+    bilinmeyen = kategori.isna()
+    filtrelenmis = df_fonlar[kategori.isin(kategoriler) | bilinmeyen]
+    print(f"ℹ️ Kategori filtresi ({', '.join(kategoriler)}): {len(df_fonlar)} fondan {len(filtrelenmis)} fon taranacak.")
+    if bilinmeyen.any():
+        ornek = ', '.join(df_fonlar.loc[bilinmeyen, 'Fon Kodu'].astype(str).head(10))
+        print(f"ℹ️ {int(bilinmeyen.sum())} fon kategori indeksinde bulunamadı ve filtrelenmeden bırakıldı: {ornek}"
+              f"{' ...' if bilinmeyen.sum() > 10 else ''}")
+    return filtrelenmis
+
+
+def kategori_secenegini_oku(secenekler: list):
+    """
+    Komut satırındaki '--category=hisse_yogun,hisse' seçeneğini kategori
+    listesine çevirir. Seçenek yoksa None döndürür; geçersiz kategoride çıkar.
+    """
+    degerler = [s.split('=', 1)[1] for s in secenekler if s.lower().startswith('--category=')]
+    if not degerler:
+        return None
+    kategoriler = [k.strip().lower() for d in degerler for k in d.split(',') if k.strip()]
+    gecersiz = [k for k in kategoriler if k not in KATEGORILER]
+    if gecersiz:
+        print(f"❌ Hata: Geçersiz kategori: {', '.join(gecersiz)}. Geçerli kategoriler: {', '.join(KATEGORILER)}")
+        sys.exit(1)
+    return kategoriler
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# Fonaliz - Yerel Sonuç ve Fiyat Deposu
+# Taramaların ürettiği tablolar (haftalık, tekil, Fonaliz) ve çekilen fiyat
+# geçmişleri, Google Sheets'e ek olarak yerel bir klasöre de yazılır. Sorgu
+# servisi bu klasörü okur; böylece metriklere bakmak için TEFAS'a yeniden
+# gidilmesi gerekmez.
+# Tüm dosyalar önce geçici bir dosyaya yazılıp os.replace ile yerine konur;
+# okuyan taraf hiçbir zaman yarım yazılmış bir dosya görmez. Çalışma işareti
+# dosyası en son yazılır ve tüm tabloların hazır olduğunu bildirir.
+
+import json
+import os
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+# --- AYARLAR ---
+SONUC_KLASORU = os.environ.get('FONALIZ_SONUC_KLASORU', 'sonuclar')
+FIYAT_DEPOSU_DOSYASI = 'fiyatlar.csv.gz'
+CALISMA_ISARETI_DOSYASI = 'son_calisma.json'
+
+
+def _dosya_yolu(dosya_adi):
+    return os.path.join(SONUC_KLASORU, dosya_adi)
+
+
+def atomik_yaz(dosya_adi, yazici):
+    """
+    yazici(geçici_dosya_yolu) ile içeriği geçici bir dosyaya yazar ve dosyayı
+    tek adımda hedefin yerine koyar.
+    """
+    os.makedirs(SONUC_KLASORU, exist_ok=True)
+    hedef = _dosya_yolu(dosya_adi)
+    fd, gecici = tempfile.mkstemp(dir=SONUC_KLASORU, prefix='.', suffix=os.path.splitext(dosya_adi)[1])
+    os.close(fd)
+    try:
+        yazici(gecici)
+        os.replace(gecici, hedef)
+    finally:
+        if os.path.exists(gecici):
+            os.remove(gecici)
+
+
+def sonucu_kaydet(tablo_adi: str, df):
+    """
+    Bir tarama tablosunu '<tablo_adi>.csv' olarak yerel depoya yazar. Boş
+    tablolar da yazılır; böylece depoda önceki çalışmadan kalan sonuç kalmaz.
+    """
+    if df is None:
+        return
+    try:
+        atomik_yaz(f"{tablo_adi}.csv", lambda yol: df.to_csv(yol, index=False, encoding='utf-8'))
+        print(f"✅ '{tablo_adi}' tablosu yerel depoya ({SONUC_KLASORU}) yazıldı.")
+    except Exception as e:
+        print(f"❌ Hata: '{tablo_adi}' tablosu yerel depoya yazılırken bir sorun oluştu: {e}")
+
+
+def fiyatlari_kaydet(fon_gecmisleri: dict):
+    """
+    {fon_kodu: fiyat geçmişi} sözlüğünü depodaki fiyatlarla birleştirir.
+    Aynı fon ve tarih için en son çekilen fiyat geçerli olur.
+    """
+    parcalar = [df[['date', 'price']].assign(code=fon_kodu)
+                for fon_kodu, df in fon_gecmisleri.items() if df is not None and not df.empty]
+    if not parcalar:
+        return
+    try:
+        yeni = pd.concat(parcalar, ignore_index=True)
+        yeni['date'] = pd.to_datetime(yeni['date'], errors='coerce')
+        mevcut = fiyatlari_yukle()
+        birlesik = pd.concat([mevcut, yeni[['code', 'date', 'price']]], ignore_index=True) if not mevcut.empty else yeni[['code', 'date', 'price']]
+        birlesik = (birlesik.dropna(subset=['date'])
+                    .drop_duplicates(subset=['code', 'date'], keep='last')
+                    .sort_values(by=['code', 'date']))
+        atomik_yaz(FIYAT_DEPOSU_DOSYASI, lambda yol: birlesik.to_csv(yol, index=False, date_format='%Y-%m-%d'))
+        print(f"✅ {birlesik['code'].nunique()} fonun fiyat geçmişi yerel depoya yazıldı.")
+    except Exception as e:
+        print(f"❌ Hata: Fiyat geçmişleri yerel depoya yazılırken bir sorun oluştu: {e}")
+
+
+def calisma_tamamlandi(tarama_tipi: str):
+    """
+    Çalışma işaretini günceller. Sorgu servisi bu dosyanın değiştiğini görünce
+    depoyu yeniden yükler.
+    """
+    isaret = {'tarama': tarama_tipi, 'zaman': datetime.now().isoformat()}
+
+    def yaz(yol):
+        with open(yol, 'w', encoding='utf-8') as f:
+            json.dump(isaret, f, ensure_ascii=False)
+
+    try:
+        atomik_yaz(CALISMA_ISARETI_DOSYASI, yaz)
+    except Exception as e:
+        print(f"❌ Hata: Çalışma işareti yazılamadı: {e}")
+
+
+def calisma_isaretini_oku():
+    yol = _dosya_yolu(CALISMA_ISARETI_DOSYASI)
+    if not os.path.exists(yol):
+        return {}
+    with open(yol, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def sonuclari_yukle():
+    """
+    Depodaki tüm tabloları {tablo_adi: DataFrame} olarak okur.
+    """
+    tablolar = {}
+    if not os.path.isdir(SONUC_KLASORU):
+        return tablolar
+    for dosya_adi in sorted(os.listdir(SONUC_KLASORU)):
+        if dosya_adi.endswith('.csv') and not dosya_adi.startswith('.'):
+            tablolar[dosya_adi[:-len('.csv')]] = pd.read_csv(_dosya_yolu(dosya_adi), encoding='utf-8', dtype={'Fon Kodu': str})
+    return tablolar
+
+
+def fiyatlari_yukle():
+    """
+    Fiyat deposunu 'code', 'date', 'price' sütunlu uzun tablo olarak okur.
+    """
+    yol = _dosya_yolu(FIYAT_DEPOSU_DOSYASI)
+    if not os.path.exists(yol):
+        return pd.DataFrame(columns=['code', 'date', 'price'])
+    return pd.read_csv(yol, parse_dates=['date'], dtype={'code': str})
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+# Fonaliz - Yerel Sorgu Servisi
+# Son taramaların yerel depoya yazılan sonuçlarını ve fiyat geçmişlerini
+# belleğe yükler ve salt okunur bir HTTP/JSON servisi olarak sunar.
+# Sorgular TEFAS'a gitmeden, bellekteki indekslerden ve LRU önbelleğinden
+# cevaplanır. Yeni bir tarama bittiğinde (çalışma işareti değiştiğinde)
+# depo arka planda yeniden yüklenir ve tek adımda yenisiyle değiştirilir.
+#
+# Kullanım:
+#   python sorgu_servisi.py [port]
+#
+#   GET /durum                                   -> yüklü tablolar ve son çalışma bilgisi
+#   GET /fon/<KOD>                               -> fonun tüm tablolardaki satırları
+#   GET /en-iyi?n=10[&tablo=fonaliz][&sutun=...] -> Sortino'ya (veya verilen sütuna) göre ilk N fon
+#   GET /haftalik/<KOD>[?hafta=12]               -> fonun haftalık değişim serisi (%)
+#   GET /filtre?sutun=...&islem=>&deger=2[&tablo=fonaliz][&n=100]
+#                                                -> sayısal sütunu bir değerle karşılaştıran filtre
+
+import json
+import operator
+import sys
+import threading
+import time
+import traceback
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlparse
+
+import numpy as np
+import pandas as pd
+
+from sonuc_deposu import calisma_isaretini_oku, fiyatlari_yukle, sonuclari_yukle
+
+# --- AYARLAR ---
+SERVIS_ADRESI = '127.0.0.1' # Servis yalnızca yerel makineden erişilebilir
+SERVIS_PORTU = 8765
+YENIDEN_YUKLEME_ARALIGI = 30 # Çalışma işaretinin kontrol edilme sıklığı (saniye)
+SORGU_ONBELLEK_BOYUTU = 1024
+VARSAYILAN_TABLO = 'fonaliz'
+VARSAYILAN_SIRALAMA_SUTUNU = 'Sortino Oranı (Yıllık)'
+MAKS_SONUC_SAYISI = 500
+# /filtre'de izin verilen karşılaştırmalar. Kullanıcı metni hiçbir zaman
+# DataFrame.query/eval'e verilmez; yalnızca bu işlemlerle bir maske kurulur.
+FILTRE_ISLEMLERI = {
+    '>': operator.gt, '>=': operator.ge, '<': operator.lt,
+    '<=': operator.le, '==': operator.eq, '!=': operator.ne,
+}
+
+
+class SorguHatasi(Exception):
+    def __init__(self, mesaj, durum_kodu=400):
+        super().__init__(mesaj)
+        self.durum_kodu = durum_kodu
+
+
+def _kayitlar(df):
+    df = df.replace([np.inf, -np.inf], np.nan)
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+
+def _sayi_parametresi(parametreler, ad, varsayilan):
+    """
+    Sonuç sayısı parametresini okur: 1'den küçük ya da tamsayı olmayan
+    değerler reddedilir, büyük değerler MAKS_SONUC_SAYISI ile sınırlanır.
+    """
+    try:
+        deger = int(parametreler.get(ad, varsayilan))
+    except ValueError:
+        raise SorguHatasi(f"'{ad}' bir tamsayı olmalıdır.")
+    if deger < 1:
+        raise SorguHatasi(f"'{ad}' en az 1 olmalıdır.")
+    return min(deger, MAKS_SONUC_SAYISI)
+
+
+class SonucIndeksi:
+    """
+    Depodaki tabloların ve fiyat geçmişlerinin bellekteki, sorguya hazır hali.
+    Nesne oluşturulduktan sonra değiştirilmez; yeniden yükleme yeni bir nesne
+    oluşturup eskisinin yerine koyar. Önbellek de nesneyle birlikte yenilenir.
+    """
+
+    def __init__(self):
+        self.isaret = calisma_isaretini_oku()
+        self.tablolar = sonuclari_yukle()
+
+        # Tablo -> {fon_kodu: satır} indeksi
+        self.fon_satirlari = {}
+        for tablo_adi, df in self.tablolar.items():
+            if 'Fon Kodu' in df.columns:
+                self.fon_satirlari[tablo_adi] = dict(zip(df['Fon Kodu'], _kayitlar(df)))
+
+        # Fon kodu -> tarihe göre sıralı fiyat serisi
+        fiyatlar = fiyatlari_yukle()
+        self.fiyat_serileri = {kod: grup.set_index('date')['price'].sort_index()
+                               for kod, grup in fiyatlar.groupby('code')}
+
+        self.sorgula = lru_cache(maxsize=SORGU_ONBELLEK_BOYUTU)(self._sorgula)
+
+    def _tablo(self, tablo_adi):
+        if tablo_adi not in self.tablolar:
+            raise SorguHatasi(f"'{tablo_adi}' tablosu bulunamadı. Mevcut tablolar: {sorted(self.tablolar)}", 404)
+        return self.tablolar[tablo_adi]
+
+    def _sorgula(self, yol, parametreler):
+        p = dict(parametreler)
+        parcalar = [unquote(x) for x in yol.strip('/').split('/') if x]
+        if not parcalar:
+            raise SorguHatasi("Geçersiz sorgu.", 404)
+        komut = parcalar[0]
+
+        if komut == 'durum':
+            return {
+                'son_calisma': self.isaret,
+                'tablolar': {ad: len(df) for ad, df in self.tablolar.items()},
+                'fiyat_serisi_sayisi': len(self.fiyat_serileri),
+            }
+
+        if komut == 'fon' and len(parcalar) == 2:
+            kod = parcalar[1].upper()
+            sonuc = {ad: satirlar[kod] for ad, satirlar in self.fon_satirlari.items() if kod in satirlar}
+            if not sonuc:
+                raise SorguHatasi(f"'{kod}' fonu yüklü sonuçlarda bulunamadı.", 404)
+            return {'Fon Kodu': kod, 'tablolar': sonuc}
+
+        if komut == 'en-iyi':
+            df = self._tablo(p.get('tablo', VARSAYILAN_TABLO))
+            sutun = p.get('sutun', VARSAYILAN_SIRALAMA_SUTUNU)
+            if sutun not in df.columns:
+                raise SorguHatasi(f"'{sutun}' sütunu bulunamadı.")
+            if not pd.api.types.is_numeric_dtype(df[sutun]):
+                raise SorguHatasi(f"'{sutun}' sütunu sayısal değil.")
+            n = _sayi_parametresi(p, 'n', 10)
+            return _kayitlar(df.nlargest(n, sutun))
+
+        if komut == 'haftalik' and len(parcalar) == 2:
+            kod = parcalar[1].upper()
+            hafta = _sayi_parametresi(p, 'hafta', 12)
+            seri = self.fiyat_serileri.get(kod)
+            if seri is None or seri.empty:
+                raise SorguHatasi(f"'{kod}' fonu için fiyat geçmişi bulunamadı.", 404)
+            haftalik = (seri.resample('W-FRI').last().ffill().pct_change() * 100).dropna().tail(hafta)
+            return [{'hafta_sonu': t.strftime('%Y-%m-%d'), 'degisim_yuzde': round(float(v), 4)} for t, v in haftalik.items()]
+
+        if komut == 'filtre':
+            df = self._tablo(p.get('tablo', VARSAYILAN_TABLO))
+            sutun, islem, deger = p.get('sutun'), p.get('islem'), p.get('deger')
+            if not sutun or not islem or deger is None:
+                raise SorguHatasi("'sutun', 'islem' ve 'deger' parametreleri gerekli. Örnek: sutun=Sortino Oranı (Yıllık)&islem=>&deger=2")
+            if sutun not in df.columns:
+                raise SorguHatasi(f"'{sutun}' sütunu bulunamadı.")
+            if not pd.api.types.is_numeric_dtype(df[sutun]):
+                raise SorguHatasi(f"'{sutun}' sütunu sayısal değil.")
+            if islem not in FILTRE_ISLEMLERI:
+                raise SorguHatasi(f"Geçersiz işlem: '{islem}'. Geçerli işlemler: {' '.join(FILTRE_ISLEMLERI)}")
+            try:
+                deger = float(deger)
+            except ValueError:
+                raise SorguHatasi(f"'deger' sayısal olmalıdır: '{deger}'")
+            filtrelenmis = df[FILTRE_ISLEMLERI[islem](df[sutun], deger)]
+            return _kayitlar(filtrelenmis.head(_sayi_parametresi(p, 'n', 100)))
+
+        raise SorguHatasi("Geçersiz sorgu.", 404)
+
+
+_indeks = None
+_indeks_kilidi = threading.Lock()
+
+
+def indeksi_yukle():
+    """
+    Depoyu yeni bir indekse yükler ve hazır olduğunda tek adımda etkin indeksle
+    değiştirir. Yükleme sırasında gelen sorgular eski indeksten cevaplanır.
+    """
+    global _indeks
+    yeni_indeks = SonucIndeksi()
+    with _indeks_kilidi:
+        _indeks = yeni_indeks
+    print(f"✅ Sonuç deposu yüklendi: {', '.join(f'{ad} ({len(df)})' for ad, df in yeni_indeks.tablolar.items()) or 'tablo yok'}, "
+          f"{len(yeni_indeks.fiyat_serileri)} fiyat serisi.")
+
+
+def _yeniden_yukleme_dongusu():
+    while True:
+        time.sleep(YENIDEN_YUKLEME_ARALIGI)
+        try:
+            if calisma_isaretini_oku() != _indeks.isaret:
+                print("ℹ️ Yeni tarama sonucu algılandı, depo yeniden yükleniyor...")
+                indeksi_yukle()
+        except Exception as e:
+            print(f"❌ Depo yeniden yüklenirken hata: {e}")
+            traceback.print_exc()
+
+
+class SorguIstekIsleyici(BaseHTTPRequestHandler):
+    def do_GET(self):
+        adres = urlparse(self.path)
+        parametreler = tuple(sorted(parse_qsl(adres.query)))
+        try:
+            durum_kodu, govde = 200, _indeks.sorgula(adres.path, parametreler)
+        except SorguHatasi as e:
+            durum_kodu, govde = e.durum_kodu, {'hata': str(e)}
+        except ValueError as e:
+            durum_kodu, govde = 400, {'hata': str(e)}
+        except Exception as e:
+            traceback.print_exc()
+            durum_kodu, govde = 500, {'hata': str(e)}
+
+        veri = json.dumps(govde, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(durum_kodu)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(veri)))
+        self.end_headers()
+        self.wfile.write(veri)
+
+    def log_message(self, format, *args):
+        pass # Her istek için konsola yazma
+
+
+def servisi_baslat(port: int = SERVIS_PORTU):
+    indeksi_yukle()
+    threading.Thread(target=_yeniden_yukleme_dongusu, daemon=True).start()
+    sunucu = ThreadingHTTPServer((SERVIS_ADRESI, port), SorguIstekIsleyici)
+    print(f"✅ Sorgu servisi http://{SERVIS_ADRESI}:{port} adresinde çalışıyor. Durdurmak için Ctrl+C.")
+    try:
+        sunucu.serve_forever()
+    except KeyboardInterrupt:
+        print("\nℹ️ Sorgu servisi durduruluyor...")
+    finally:
+        sunucu.server_close()
+
+
+if __name__ == '__main__':
+    try:
+        port_arg = int(sys.argv[1]) if len(sys.argv) > 1 else SERVIS_PORTU
+    except ValueError:
+        print("❌ Hata: Port bir tamsayı olmalıdır.")
+        sys.exit(1)
+    servisi_baslat(port_arg)
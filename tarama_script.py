@@ -8,7 +8,9 @@ import numpy as np
 import time
 import sys
 from datetime import datetime, timedelta, date
-from tefas import Crawler
+from crawler_havuzu import havuzdan_crawler
+from veri_temizleme import gecmisleri_temizle
+from fon_siniflandirma import kategoriye_gore_filtrele, kategori_secenegini_oku, KATEGORI_META_SUTUNLARI
 import concurrent.futures
 import warnings
 import os
@@ -24,7 +26,7 @@ def load_takasbank_fund_list():
     print("Takasbank'tan güncel fon listesi yükleniyor...")
     try:
         df_excel = pd.read_excel(TAKASBANK_EXCEL_URL, engine='openpyxl')
-        df_data = df_excel[['Fon Adı', 'Fon Kodu']].copy()
+        df_data = df_excel[['Fon Adı', 'Fon Kodu'] + [s for s in KATEGORI_META_SUTUNLARI if s in df_excel.columns]].copy()
         df_data['Fon Kodu'] = df_data['Fon Kodu'].astype(str).str.strip().str.upper()
         df_data.dropna(subset=['Fon Kodu'], inplace=True)
         df_data = df_data[df_data['Fon Kodu'] != '']
@@ -35,10 +37,10 @@ def load_takasbank_fund_list():
         return pd.DataFrame()
 
 def get_price_on_or_before(df_fund_history, target_date: date):
+    # Geçmişin gecmisleri_temizle ile tarihe göre sıralanmış ve tekilleştirilmiş olduğu varsayılır
     if df_fund_history is None or df_fund_history.empty or target_date is None: return np.nan
-    df_filtered = df_fund_history[df_fund_history['date'] <= target_date].copy()
-    if not df_filtered.empty: return df_filtered.sort_values(by='date', ascending=False)['price'].iloc[0]
-    return np.nan
+    idx = df_fund_history['date'].searchsorted(target_date, side='right') - 1
+    return df_fund_history['price'].iloc[idx] if idx >= 0 else np.nan
 
 def calculate_change(current_price, past_price):
     if pd.isna(current_price) or pd.isna(past_price): return np.nan
@@ -51,24 +53,24 @@ def calculate_change(current_price, past_price):
 def fetch_data_for_fund_parallel(args):
     fon_kodu, start_date, end_date = args
     try:
-        crawler = Crawler()
-        df = crawler.fetch(
-            start=start_date.strftime("%Y-%m-%d"),
-            end=end_date.strftime("%Y-%m-%d"),
-            name=fon_kodu,
-            columns=["date", "price", "title"]
-        )
+        with havuzdan_crawler() as crawler:
+            df = crawler.fetch(
+                start=start_date.strftime("%Y-%m-%d"),
+                end=end_date.strftime("%Y-%m-%d"),
+                name=fon_kodu,
+                columns=["date", "price", "title"]
+            )
         if not df.empty:
             df['date'] = pd.to_datetime(df['date'], errors='coerce').dt.date
-            return fon_kodu, df.sort_values(by='date').reset_index(drop=True)
+            return fon_kodu, df
     except Exception:
         return fon_kodu, None
     return fon_kodu, None
 
-def run_weekly_scan(num_weeks: int):
+def run_weekly_scan(num_weeks: int, kategoriler: list = None):
     start_time_main = time.time()
     today = date.today()
-    all_fon_data_df = load_takasbank_fund_list()
+    all_fon_data_df = kategoriye_gore_filtrele(load_takasbank_fund_list(), kategoriler)
 
     if all_fon_data_df.empty:
         print("Taranacak fon listesi alınamadı. İşlem durduruldu.")
@@ -80,6 +82,7 @@ def run_weekly_scan(num_weeks: int):
     tasks = [(fon_kodu, genel_veri_cekme_baslangic_tarihi, today) for fon_kodu in all_fon_data_df['Fon Kodu'].unique()]
     
     weekly_results = []
+    ham_gecmisler = {}
     
     with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
         future_to_fon = {executor.submit(fetch_data_for_fund_parallel, args): args[0] for args in tasks}
@@ -87,21 +90,25 @@ def run_weekly_scan(num_weeks: int):
         for future in concurrent.futures.as_completed(future_to_fon):
             fon_kodu, fund_history = future.result()
             if fund_history is None or fund_history.empty: continue
-
-            weekly_changes = []
-            current_week_end_date = today
-            for _ in range(num_weeks):
-                current_week_start_date = current_week_end_date - timedelta(days=7)
-                price_end = get_price_on_or_before(fund_history, current_week_end_date)
-                price_start = get_price_on_or_before(fund_history, current_week_start_date)
-                weekly_changes.append(calculate_change(price_end, price_start))
-                current_week_end_date = current_week_start_date
-            
-            if len(weekly_changes) == num_weeks and all(pd.notna(c) for c in weekly_changes):
-                result = {'Fon Kodu': fon_kodu}
-                for i, change in enumerate(weekly_changes):
-                    result[f'Hafta_{i+1}_Getiri'] = change
-                weekly_results.append(result)
+            ham_gecmisler[fon_kodu] = fund_history
+
+    fon_gecmisleri, _ = gecmisleri_temizle(ham_gecmisler)
+
+    for fon_kodu, fund_history in fon_gecmisleri.items():
+        weekly_changes = []
+        current_week_end_date = today
+        for _ in range(num_weeks):
+            current_week_start_date = current_week_end_date - timedelta(days=7)
+            price_end = get_price_on_or_before(fund_history, current_week_end_date)
+            price_start = get_price_on_or_before(fund_history, current_week_start_date)
+            weekly_changes.append(calculate_change(price_end, price_start))
+            current_week_end_date = current_week_start_date
+        
+        if len(weekly_changes) == num_weeks and all(pd.notna(c) for c in weekly_changes):
+            result = {'Fon Kodu': fon_kodu}
+            for i, change in enumerate(weekly_changes):
+                result[f'Hafta_{i+1}_Getiri'] = change
+            weekly_results.append(result)
 
     results_df = pd.DataFrame(weekly_results)
     print(f"Haftalık tarama tamamlandı. Toplam Süre: {time.time() - start_time_main:.2f} saniye")
@@ -111,12 +118,17 @@ def run_weekly_scan(num_weeks: int):
 if __name__ == "__main__":
     print("--- Tarama Script'i Başlatıldı ---")
     
+    # --category=hisse_yogun,hisse gibi seçenekler konum argümanlarından ayrılır
+    secenekler = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+    sys.argv = [sys.argv[0]] + [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    kategoriler_arg = kategori_secenegini_oku(secenekler)
+
     try:
         num_weeks_arg = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[1].lower() == 'weekly' else 2
     except (ValueError, IndexError):
         num_weeks_arg = 2 # Varsayılan 2 hafta
 
-    haftalik_sonuclar_df = run_weekly_scan(num_weeks=num_weeks_arg)
+    haftalik_sonuclar_df = run_weekly_scan(num_weeks=num_weeks_arg, kategoriler=kategoriler_arg)
 
     if not haftalik_sonuclar_df.empty:
         print("\nFiltreleme uygulanıyor: Son 2 haftanın toplam getirisi >= %2")
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# Fonaliz - Fon Geçmişi Doğrulama ve Temizleme
+# Bir taramada çekilen tüm fon geçmişleri tek seferde, fon bazında döngü
+# kurmadan temizlenir: tarihler sıralanır ve tekilleştirilir, sıfır/boş
+# fiyatlar atılır; fiyat sıçramaları, bölünme benzeri kalıcı sıçramalar ve
+# veri boşlukları raporlanır. Temizlenmiş geçmişleri kullanan fonksiyonlar
+# verinin tarihe göre sıralı ve her tarihin tek olduğunu varsayabilir.
+
+import numpy as np
+import pandas as pd
+
+# --- AYARLAR ---
+SICRAMA_ESIGI = 0.15 # Ertesi gün geri dönen bu orandan büyük günlük değişimler sıçrama sayılır
+BOLUNME_ESIGI = 0.40 # Geri dönmeyen bu orandan büyük günlük değişimler bölünme benzeri sayılır
+BOSLUK_GUN_ESIGI = 10 # İki fiyat arasındaki bu sayıdan fazla takvim günü veri boşluğu sayılır
+
+RAPOR_SUTUNLARI = ['Fon Kodu', 'Tarih', 'Sorun', 'Değer']
+
+
+def gecmisleri_temizle(fon_gecmisleri: dict):
+    """
+    {fon_kodu: fiyat geçmişi} sözlüğündeki tüm geçmişleri birlikte temizler.
+
+    Aynı tarih için birden fazla fiyat varsa en son çekilen tutulur. Sonuç
+    sözlüğündeki her geçmiş tarihe göre artan sıralı, tarihleri tekil ve
+    fiyatları pozitiftir; 'date' sütunu datetime.date tipindedir.
+    (temiz_gecmisler, rapor) döndürür; rapor her şüpheli gözlem için bir satır
+    içeren bir DataFrame'dir.
+    """
+    parcalar = [df.assign(code=fon_kodu) for fon_kodu, df in fon_gecmisleri.items() if df is not None and not df.empty]
+    if not parcalar:
+        return {}, pd.DataFrame(columns=RAPOR_SUTUNLARI)
+
+    uzun = pd.concat(parcalar, ignore_index=True)
+    ham_satir_sayisi = len(uzun)
+    uzun['date'] = pd.to_datetime(uzun['date'], errors='coerce')
+    uzun['price'] = pd.to_numeric(uzun['price'], errors='coerce')
+
+    gecersiz = uzun['date'].isna() | uzun['price'].isna() | (uzun['price'] <= 0)
+    uzun = uzun[~gecersiz]
+    # Kararlı sıralama, aynı tarihteki satırların çekilme sırasını korur
+    uzun = uzun.sort_values(by=['code', 'date'], kind='mergesort')
+    tekrar = uzun.duplicated(subset=['code', 'date'], keep='last')
+    uzun = uzun[~tekrar].reset_index(drop=True)
+    if uzun.empty:
+        print(f"ℹ️ Veri temizleme: {ham_satir_sayisi} satırın tamamı geçersiz; temizlenmiş geçmiş kalmadı.")
+        return {}, pd.DataFrame(columns=RAPOR_SUTUNLARI)
+
+    # --- Şüpheli gözlemler (tüm fonlar için tek geçişte) ---
+    kodlar, tarihler, fiyatlar = uzun['code'].to_numpy(), uzun['date'].to_numpy(), uzun['price'].to_numpy(dtype=float)
+    onceki_ayni_fon = np.r_[False, kodlar[1:] == kodlar[:-1]]
+    log_getiri = np.full(len(uzun), np.nan)
+    log_getiri[1:] = np.log(fiyatlar[1:] / fiyatlar[:-1])
+    log_getiri[~onceki_ayni_fon] = np.nan
+    sonraki_log_getiri = np.r_[log_getiri[1:], np.nan]
+
+    with np.errstate(invalid='ignore'):
+        sicrama = ((np.abs(log_getiri) > np.log1p(SICRAMA_ESIGI))
+                   & (np.abs(sonraki_log_getiri) > np.log1p(SICRAMA_ESIGI))
+                   & (np.sign(log_getiri) != np.sign(sonraki_log_getiri)))
+        geri_donus = np.r_[False, sicrama[:-1]]
+        bolunme = (np.abs(log_getiri) > np.log1p(BOLUNME_ESIGI)) & ~sicrama & ~geri_donus
+    bosluk_gun = np.full(len(uzun), 0.0)
+    bosluk_gun[1:] = (tarihler[1:] - tarihler[:-1]) / np.timedelta64(1, 'D')
+    bosluk = onceki_ayni_fon & (bosluk_gun > BOSLUK_GUN_ESIGI)
+
+    degisim = np.round(np.expm1(log_getiri) * 100, 2)
+    rapor = pd.concat([
+        pd.DataFrame({'Fon Kodu': kodlar[maske], 'Tarih': uzun['date'].dt.date.to_numpy()[maske], 'Sorun': sorun, 'Değer': deger[maske]})
+        for maske, sorun, deger in [
+            (sicrama, 'Fiyat sıçraması (%)', degisim),
+            (bolunme, 'Bölünme benzeri sıçrama (%)', degisim),
+            (bosluk, 'Veri boşluğu (gün)', bosluk_gun),
+        ]
+    ], ignore_index=True).sort_values(by=['Fon Kodu', 'Tarih']).reset_index(drop=True)
+
+    uzun['date'] = uzun['date'].dt.date
+    temiz_gecmisler = {fon_kodu: grup[fon_gecmisleri[fon_kodu].columns].reset_index(drop=True)
+                       for fon_kodu, grup in uzun.groupby('code', sort=False)}
+
+    print(f"ℹ️ Veri temizleme: {len(temiz_gecmisler)} fon, {ham_satir_sayisi} satırdan {int(gecersiz.sum())} geçersiz fiyat "
+          f"ve {int(tekrar.sum())} tekrarlanan tarih atıldı. "
+          f"{int(sicrama.sum())} sıçrama, {int(bolunme.sum())} bölünme benzeri sıçrama, {int(bosluk.sum())} veri boşluğu işaretlendi.")
+    return temiz_gecmisler, rapor
+
@@ -12,9 +12,16 @@ import json
 import sys
 from datetime import datetime, timedelta, date, timezone
 from dateutil.relativedelta import relativedelta
-from tefas import Crawler
+from crawler_havuzu import havuzdan_crawler, havuzu_kapat
+from fon_metrikleri import hesapla_cok_donemli_metrikler, cok_donemli_sutun_sirasi, ufuk_sutun_adlari
+from veri_temizleme import gecmisleri_temizle
+from fon_siniflandirma import kategoriye_gore_filtrele, kategori_secenegini_oku, KATEGORI_META_SUTUNLARI
+from fon_portfoyu import kisa_liste_portfoyleri
+from sonuc_deposu import sonucu_kaydet, fiyatlari_kaydet, calisma_tamamlandi
+from fon_kumeleme import getiri_matrisi_olustur, kumeleri_bul, kume_temsilcilerine_indir, kume_raporu_yaz, KUMELEME_KORELASYON_ESIGI
 from tqdm import tqdm
 import concurrent.futures
+import threading
 import traceback
 import warnings
 
@@ -27,11 +34,23 @@ SHEET_ID = '1hSD4towyxKk9QHZFAcRlXy9NlLa_AyVrB9Jsy86ok14' # OtoFon Google Sheet
 WORKSHEET_NAME_MANUAL = 'veriler' # Tekil tarama için
 WORKSHEET_NAME_WEEKLY = 'haftalık' # Haftalık tarama için
 WORKSHEET_NAME_FONALIZ = 'Fonanaliz' # Fonaliz için
+WORKSHEET_NAME_FONALIZ_COKLU = 'Fonanaliz Çok Dönem' # Çok dönemli Fonaliz için
+WORKSHEET_NAME_PORTFOY = 'Fonanaliz Portföy' # Portföy ağırlıkları için
+WORKSHEET_NAME_ETKIN_SINIR = 'Fonanaliz Etkin Sınır' # Portföy özetleri ve etkin sınır için
 TIMEZONE = pytz.timezone('Europe/Istanbul')
 MAX_WORKERS = 10 # Paralel işlemler için maksimum işçi sayısı
 TEFAS_CHUNK_DAYS = 90 # TEFAS API'sinden veri çekerken tek seferde çekilecek gün sayısı
 TEFAS_MAX_RETRIES = 3 # TEFAS API hatası durumunda maksimum deneme sayısı
 TEFAS_RETRY_DELAY = 5 # Yeniden deneme öncesi bekleme süresi (saniye)
+FONALIZ_ANALIZ_SURESI_AY = 3 # Fonaliz'in varsayılan analiz dönemi
+FONALIZ_UFUKLARI_AY = [1, 3, 6, 12] # Çok dönemli Fonaliz'de hesaplanan dönemler
+KUME_RAPORU_DOSYASI = "fon_kumeleri.txt" # Benzer fon kümelerinin yazıldığı dosya
+
+# serve/watch (sürekli çalışma) modu ayarları
+DAEMON_GOREV_PLANI = [('11:15', 'weekly'), ('14:00', 'weekly'), ('17:30', 'weekly'), ('18:30', 'single')] # İstanbul saati
+DAEMON_IS_GUNLERI = [0, 1, 2, 3, 4] # Pazartesi-Cuma
+DAEMON_BASLANGICTA_CALISTIR = True # Başlangıçta önbelleği ısıtmak için haftalık görevi hemen çalıştır
+FON_LISTESI_YENILEME_SAATI = 24 # Takasbank fon listesinin bellekte tutulacağı süre (saat)
 
 # TEFAS'tan çekilecek varsayılan sütunlar (Tekil ve Haftalık taramalar için)
 DEFAULT_TEFAS_COLS = ["date", "price"]
@@ -55,13 +74,6 @@ def google_sheets_auth():
         traceback.print_exc()
         sys.exit(1)
 
-try:
-    tefas_crawler_global = Crawler()
-    print("TEFAS Crawler başarıyla başlatıldı.")
-except Exception as e:
-    print(f"TEFAS Crawler başlatılırken hata: {e}")
-    tefas_crawler_global = None
-
 # --- GÜNCELLENMİŞ FONKSİYON ---
 # Bu fonksiyon, fon listesini artık bir metin dosyasına yazacak şekilde güncellenmiştir.
 def load_takasbank_fund_list():
@@ -74,7 +86,8 @@ def load_takasbank_fund_list():
     print(f"ℹ️ Fon listesi şu adresten çekiliyor: {TAKASBANK_EXCEL_URL}")
     try:
         df_excel = pd.read_excel(TAKASBANK_EXCEL_URL, engine='openpyxl')
-        df_data = df_excel[['Fon Adı', 'Fon Kodu']].copy()
+        # Fon türü sütunları varsa kategori sınıflandırmasında kullanılmak üzere tutulur
+        df_data = df_excel[['Fon Adı', 'Fon Kodu'] + [s for s in KATEGORI_META_SUTUNLARI if s in df_excel.columns]].copy()
         df_data['Fon Kodu'] = df_data['Fon Kodu'].astype(str).str.strip().str.upper()
         df_data.dropna(subset=['Fon Kodu'], inplace=True)
         df_data = df_data[df_data['Fon Kodu'] != '']
@@ -110,10 +123,10 @@ def load_takasbank_fund_list():
         return pd.DataFrame()
 
 def get_price_on_or_before(df_fund_history, target_date: date):
+    # Geçmişin gecmisleri_temizle ile tarihe göre sıralanmış ve tekilleştirilmiş olduğu varsayılır
     if df_fund_history is None or df_fund_history.empty or target_date is None: return np.nan
-    df_filtered = df_fund_history[df_fund_history['date'] <= target_date].copy()
-    if not df_filtered.empty: return df_filtered.sort_values(by='date', ascending=False)['price'].iloc[0]
-    return np.nan
+    idx = df_fund_history['date'].searchsorted(target_date, side='right') - 1
+    return df_fund_history['price'].iloc[idx] if idx >= 0 else np.nan
 
 def calculate_change(current_price, past_price):
     if pd.isna(current_price) or pd.isna(past_price) or past_price is None or current_price is None: return np.nan
@@ -124,16 +137,32 @@ def calculate_change(current_price, past_price):
     except (ValueError, TypeError): return np.nan
 
 def fetch_data_for_fund_parallel(args):
+    """
+    Bir fonun fiyat geçmişini döndürür. serve/watch modunda sıcak önbellek
+    kullanılır ve TEFAS'tan yalnızca eksik günler çekilir; aksi halde veri
+    doğrudan TEFAS'tan çekilir.
+    Args:
+        args: Bir tuple (fon_kodu, start_date_overall, end_date_overall, columns_to_fetch)
+    """
+    if _sicak_onbellek is not None:
+        return _sicak_onbellek.getir(args)
+    return fetch_data_for_fund_from_tefas(args)[:3]
+
+def fetch_data_for_fund_from_tefas(args):
     """
     TEFAS API'sinden veri çekerken chunking ve yeniden deneme mantığı içerir.
+    Her iş parçacığı havuzdaki kendi Crawler oturumunu kullanır; hata alan
+    oturum yeniden denemeden önce yenilenir.
+    (fon_kodu, fon_adi, veri, eksik_parca) döndürür; eksik_parca, tüm denemelere
+    rağmen çekilemeyen bir tarih parçası varsa True'dur. Boş veri tek başına
+    hata anlamına gelmez (fon o aralıkta işlem görmemiş olabilir).
     Args:
         args: Bir tuple (fon_kodu, start_date_overall, end_date_overall, columns_to_fetch)
     """
     fon_kodu, start_date_overall, end_date_overall, columns_to_fetch = args
-    global tefas_crawler_global
-    if tefas_crawler_global is None: return fon_kodu, None, pd.DataFrame() # fon_adi, df_data
     
     all_fon_data = pd.DataFrame()
+    eksik_parca = False
     current_start_date_chunk = start_date_overall
 
     while current_start_date_chunk <= end_date_overall:
@@ -143,12 +172,13 @@ def fetch_data_for_fund_parallel(args):
         while retries < TEFAS_MAX_RETRIES and not success:
             try:
                 if current_start_date_chunk <= current_end_date_chunk:
-                    chunk_data_fetched = tefas_crawler_global.fetch(
-                        start=current_start_date_chunk.strftime("%Y-%m-%d"),
-                        end=current_end_date_chunk.strftime("%Y-%m-%d"),
-                        name=fon_kodu,
-                        columns=columns_to_fetch
-                    )
+                    with havuzdan_crawler() as crawler:
+                        chunk_data_fetched = crawler.fetch(
+                            start=current_start_date_chunk.strftime("%Y-%m-%d"),
+                            end=current_end_date_chunk.strftime("%Y-%m-%d"),
+                            name=fon_kodu,
+                            columns=columns_to_fetch
+                        )
                 if not chunk_data_fetched.empty:
                     all_fon_data = pd.concat([all_fon_data, chunk_data_fetched], ignore_index=True)
                 success = True
@@ -156,20 +186,124 @@ def fetch_data_for_fund_parallel(args):
                 #print(f"DEBUG: {fon_kodu} için {current_start_date_chunk}-{current_end_date_chunk} aralığında hata ({retries+1}/{TEFAS_MAX_RETRIES}): {e}")
                 retries += 1
                 time.sleep(TEFAS_RETRY_DELAY)
+        eksik_parca = eksik_parca or not success
 
         current_start_date_chunk = current_end_date_chunk + timedelta(days=1)
 
+    # Tekilleştirme, sıralama ve fiyat kontrolleri tüm tarama için gecmisleri_temizle'de yapılır
     if not all_fon_data.empty:
-        all_fon_data.drop_duplicates(subset=['date', 'price'], keep='first', inplace=True)
         if 'date' in all_fon_data.columns:
             all_fon_data['date'] = pd.to_datetime(all_fon_data['date'], errors='coerce').dt.date
             all_fon_data.dropna(subset=['date'], inplace=True)
-        all_fon_data.sort_values(by='date').reset_index(drop=True, inplace=True)
         fon_adi = all_fon_data['title'].iloc[0] if 'title' in all_fon_data.columns and not all_fon_data.empty else fon_kodu
     else:
         fon_adi = fon_kodu # Eğer veri çekilemezse fon_adi olarak kodu kullan
     
-    return fon_kodu, fon_adi, all_fon_data
+    return fon_kodu, fon_adi, all_fon_data, eksik_parca
+
+def fon_gecmislerini_cek(fon_args_list, desc):
+    """
+    Verilen fonların geçmişlerini paralel olarak çeker ve tüm partiyi tek
+    seferde temizler. Boş gelen fonlar sonuca girmez.
+    ({fon_kodu: temiz geçmiş}, {fon_kodu: fon_adi}, veri kalitesi raporu) döndürür.
+    """
+    ham_gecmisler, fon_adlari = {}, {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        future_to_fon = {executor.submit(fetch_data_for_fund_parallel, args): args[0] for args in fon_args_list}
+        progress_bar = tqdm(concurrent.futures.as_completed(future_to_fon), total=len(fon_args_list), desc=desc)
+
+        for future in progress_bar:
+            fon_kodu, fon_adi, fund_history = future.result()
+            if fund_history is not None and not fund_history.empty:
+                ham_gecmisler[fon_kodu] = fund_history
+                fon_adlari[fon_kodu] = fon_adi if fon_adi else fon_kodu
+
+    fon_gecmisleri, veri_kalitesi_raporu = gecmisleri_temizle(ham_gecmisler)
+    return fon_gecmisleri, {fon_kodu: fon_adlari[fon_kodu] for fon_kodu in fon_gecmisleri}, veri_kalitesi_raporu
+
+# --- SICAK ÖNBELLEK (serve/watch modu) ---
+_sicak_onbellek = None # serve/watch modunda SicakOnbellek örneği; tek seferlik çalıştırmalarda None
+
+def _tarihe_cevir(deger):
+    return pd.Timestamp(deger).date()
+
+class SicakOnbellek:
+    """
+    serve/watch modunda süreç boyunca bellekte tutulan fon listesi ve fiyat
+    geçmişleri. Bir fonun geçmişi ilk istekte tamamen çekilir; sonraki
+    isteklerde yalnızca önbellekteki son işlem gününden itibaren olan günler
+    (gün içi güncellenmiş olabilecek son gün dahil) çekilip eklenir.
+    """
+
+    def __init__(self):
+        self.fon_listesi_df = pd.DataFrame()
+        self.fon_listesi_zamani = None
+        self.gecmisler = {} # (fon_kodu, sütunlar) -> (fon_adi, df, kapsam_baslangic, kapsam_bitis)
+        self.kilit = threading.Lock()
+
+    def fon_listesi(self):
+        simdi = datetime.now(TIMEZONE)
+        if self.fon_listesi_df.empty or simdi - self.fon_listesi_zamani > timedelta(hours=FON_LISTESI_YENILEME_SAATI):
+            df_data = load_takasbank_fund_list()
+            if not df_data.empty:
+                self.fon_listesi_df, self.fon_listesi_zamani = df_data, simdi
+        return self.fon_listesi_df
+
+    def getir(self, args):
+        fon_kodu, start_date, end_date, columns_to_fetch = args
+        start_date, end_date = _tarihe_cevir(start_date), _tarihe_cevir(end_date)
+        anahtar = (fon_kodu, tuple(columns_to_fetch))
+        with self.kilit:
+            kayit = self.gecmisler.get(anahtar)
+
+        if kayit is None:
+            _, fon_adi, df_gecmis, eksik_parca = fetch_data_for_fund_from_tefas((fon_kodu, start_date, end_date, columns_to_fetch))
+            # Bir parçası çekilemeyen geçmiş önbelleğe alınmaz; aksi halde
+            # eksik günler kapsanmış sayılır ve bir daha istenmezdi.
+            onbellege_al = not eksik_parca
+            kapsam_baslangic, kapsam_bitis = start_date, end_date
+        else:
+            fon_adi, df_gecmis, kapsam_baslangic, kapsam_bitis = kayit
+            onbellege_al = True
+            parcalar = [df_gecmis]
+            # Kapsam yalnızca tamamı çekilebilen parçalar kadar genişletilir;
+            # çekilemeyen parça bir sonraki istekte yeniden denenir.
+            yeni_baslangic, yeni_bitis = kapsam_baslangic, kapsam_bitis
+            if start_date < kapsam_baslangic:
+                _, _, bas_veri, eksik_parca = fetch_data_for_fund_from_tefas((fon_kodu, start_date, kapsam_baslangic - timedelta(days=1), columns_to_fetch))
+                parcalar.append(bas_veri)
+                if not eksik_parca:
+                    yeni_baslangic = start_date
+            if end_date >= kapsam_bitis:
+                son_veri_tarihi = df_gecmis['date'].max() if not df_gecmis.empty else kapsam_bitis
+                kuyruk_baslangic = max(min(son_veri_tarihi, kapsam_bitis), start_date)
+                _, _, kuyruk_veri, eksik_parca = fetch_data_for_fund_from_tefas((fon_kodu, kuyruk_baslangic, end_date, columns_to_fetch))
+                parcalar.append(kuyruk_veri)
+                if not eksik_parca:
+                    yeni_bitis = end_date
+            parcalar = [p for p in parcalar if p is not None and not p.empty]
+            if len(parcalar) > 1:
+                df_gecmis = (pd.concat(parcalar, ignore_index=True)
+                             .drop_duplicates(subset=['date'], keep='last')
+                             .sort_values(by='date').reset_index(drop=True))
+            kapsam_baslangic, kapsam_bitis = yeni_baslangic, yeni_bitis
+
+        # Çekilemeyen fonlar önbelleğe alınmaz; bir sonraki görevde tekrar denenir
+        if df_gecmis is not None and not df_gecmis.empty:
+            if onbellege_al:
+                with self.kilit:
+                    self.gecmisler[anahtar] = (fon_adi, df_gecmis, kapsam_baslangic, kapsam_bitis)
+            df_gecmis = df_gecmis[(df_gecmis['date'] >= start_date) & (df_gecmis['date'] <= end_date)].reset_index(drop=True)
+        return fon_kodu, fon_adi, df_gecmis
+
+def fon_listesini_yukle():
+    """
+    serve/watch modunda bellekteki fon listesini, aksi halde Takasbank'tan
+    güncel listeyi döndürür.
+    """
+    if _sicak_onbellek is not None:
+        return _sicak_onbellek.fon_listesi()
+    return load_takasbank_fund_list()
 
 def apply_cell_format_request(worksheet_id, row_index, num_columns, is_highlight):
     if is_highlight:
@@ -225,9 +359,13 @@ def hesapla_metrikler(df_fon_fiyat):
         'Yatırımcı Sayısı': yatirimci_sayisi
     }
 
-def run_fonaliz_scan_to_gsheets(fon_listesi: list, gc):
+def run_fonaliz_scan_to_gsheets(fon_listesi: list, gc, coklu_donem: bool = False, portfoy: bool = False):
     """
     Verilen fon listesi için Fonaliz metriklerini hesaplar ve Google Sheets'e yazar.
+    coklu_donem=True ise en uzun dönemin verisi bir kez çekilir ve
+    FONALIZ_UFUKLARI_AY'daki tüm dönemlerin metrikleri tek bir geniş tablo
+    olarak ayrı bir sayfaya yazılır. portfoy=True ise sıralanan fonlardan
+    portföy ağırlıkları hesaplanır ve Fonaliz sayfasının yanına yazılır.
     """
     print("\n" + "="*40)
     print("      AŞAMA 3: FONALİZ RİSK ANALİZİ BAŞLATILIYOR")
@@ -238,44 +376,55 @@ def run_fonaliz_scan_to_gsheets(fon_listesi: list, gc):
         print("ℹ️ Fonaliz için filtreden geçen fon bulunamadı. İşlem atlanıyor.")
         return
 
-    ANALIZ_SURESI_AY = 3
     end_date = datetime.now(TIMEZONE).date()
-    start_date = end_date - pd.DateOffset(months=ANALIZ_SURESI_AY) - timedelta(days=TEFAS_CHUNK_DAYS)
+    if coklu_donem:
+        start_date = end_date - relativedelta(months=max(FONALIZ_UFUKLARI_AY))
+    else:
+        start_date = end_date - pd.DateOffset(months=FONALIZ_ANALIZ_SURESI_AY) - timedelta(days=TEFAS_CHUNK_DAYS)
     
     tasks = [(fon_kodu, start_date, end_date, FONALIZ_TEFAS_COLS) for fon_kodu in fon_listesi]
     analiz_sonuclari = []
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        future_to_fon = {executor.submit(fetch_data_for_fund_parallel, task): task[0] for task in tasks}
-        progress_bar = tqdm(concurrent.futures.as_completed(future_to_fon), total=len(tasks), desc=" Fonaliz Risk Analizi")
+    fon_gecmisleri, fon_adlari, _ = fon_gecmislerini_cek(tasks, " Fonaliz Risk Analizi")
 
-        for future in progress_bar:
-            fon_kodu, fon_adi, data = future.result()
-            if data is not None and not data.empty:
-                metrikler = hesapla_metrikler(data)
-                if metrikler:
-                    sonuc = {'Fon Kodu': fon_kodu, 'Fon Adı': fon_adi, **metrikler}
-                    analiz_sonuclari.append(sonuc)
+    for fon_kodu, data in fon_gecmisleri.items():
+        fon_adi = fon_adlari[fon_kodu]
+        if coklu_donem:
+            metrikler = hesapla_cok_donemli_metrikler(data, end_date, FONALIZ_UFUKLARI_AY)
+        else:
+            metrikler = hesapla_metrikler(data)
+        if metrikler:
+            sonuc = {'Fon Kodu': fon_kodu, 'Fon Adı': fon_adi, **metrikler}
+            analiz_sonuclari.append(sonuc)
 
     if not analiz_sonuclari:
         print("\n--- SONUÇ: Fonaliz için analiz edilecek yeterli veri bulunamadı. ---")
         return
 
     df_sonuc = pd.DataFrame(analiz_sonuclari)
-    sutun_sirasi = ['Fon Kodu', 'Fon Adı', 'Yatırımcı Sayısı', 'Piyasa Değeri (TL)', 'Sortino Oranı (Yıllık)', 'Sharpe Oranı (Yıllık)', 'Getiri (%)', 'Standart Sapma (Yıllık %)']
+    if coklu_donem:
+        sutun_sirasi = cok_donemli_sutun_sirasi(FONALIZ_UFUKLARI_AY)
+        ana_ufuk = FONALIZ_ANALIZ_SURESI_AY if FONALIZ_ANALIZ_SURESI_AY in FONALIZ_UFUKLARI_AY else max(FONALIZ_UFUKLARI_AY)
+        siralama = [ufuk_sutun_adlari(ana_ufuk)['sortino'], ufuk_sutun_adlari(ana_ufuk)['sharpe']]
+        worksheet_name = WORKSHEET_NAME_FONALIZ_COKLU
+    else:
+        sutun_sirasi = ['Fon Kodu', 'Fon Adı', 'Yatırımcı Sayısı', 'Piyasa Değeri (TL)', 'Sortino Oranı (Yıllık)', 'Sharpe Oranı (Yıllık)', 'Getiri (%)', 'Standart Sapma (Yıllık %)']
+        siralama = ['Sortino Oranı (Yıllık)', 'Sharpe Oranı (Yıllık)']
+        worksheet_name = WORKSHEET_NAME_FONALIZ
     sutun_sirasi = [col for col in sutun_sirasi if col in df_sonuc.columns]
     
     df_sonuc = df_sonuc[sutun_sirasi]
-    df_sonuc_sirali = df_sonuc.sort_values(by=['Sortino Oranı (Yıllık)', 'Sharpe Oranı (Yıllık)'], ascending=[False, False])
+    df_sonuc_sirali = df_sonuc.sort_values(by=siralama, ascending=[False, False], na_position='last')
+    sonucu_kaydet('fonaliz_coklu' if coklu_donem else 'fonaliz', df_sonuc_sirali)
 
-    print(f"\n✅ Fonaliz tamamlandı. Sonuçlar Google Sheets'teki '{WORKSHEET_NAME_FONALIZ}' sayfasına yazılıyor...")
+    print(f"\n✅ Fonaliz tamamlandı. Sonuçlar Google Sheets'teki '{worksheet_name}' sayfasına yazılıyor...")
     try:
         spreadsheet = gc.open_by_key(SHEET_ID)
         try:
-            worksheet = spreadsheet.worksheet(WORKSHEET_NAME_FONALIZ)
+            worksheet = spreadsheet.worksheet(worksheet_name)
         except gspread.exceptions.WorksheetNotFound:
-            print(f"ℹ️ '{WORKSHEET_NAME_FONALIZ}' sayfası bulunamadı, yeni sayfa oluşturuluyor...")
-            worksheet = spreadsheet.add_worksheet(title=WORKSHEET_NAME_FONALIZ, rows="1000", cols=20)
+            print(f"ℹ️ '{worksheet_name}' sayfası bulunamadı, yeni sayfa oluşturuluyor...")
+            worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows="1000", cols=30)
         
         worksheet.clear()
         df_sonuc_sirali = df_sonuc_sirali.replace([np.inf, -np.inf], np.nan).fillna('')
@@ -283,17 +432,57 @@ def run_fonaliz_scan_to_gsheets(fon_listesi: list, gc):
         
         body_resize = {"requests": [{"autoResizeDimensions": {"dimensions": {"sheetId": worksheet.id, "dimension": "COLUMNS"}}}]}
         spreadsheet.batch_update(body_resize)
-        print(f"✅ Google Sheets '{WORKSHEET_NAME_FONALIZ}' sayfası güncellendi ve sütunlar yeniden boyutlandırıldı.")
+        print(f"✅ Google Sheets '{worksheet_name}' sayfası güncellendi ve sütunlar yeniden boyutlandırıldı.")
     except Exception as e:
         print(f"❌ Google Sheets'e yazma hatası (Fonaliz): {e}")
         traceback.print_exc()
 
+    if portfoy:
+        run_portfoy_optimizasyonu(fon_gecmisleri, df_sonuc_sirali['Fon Kodu'].tolist(), fon_adlari, gc)
+
+
+def run_portfoy_optimizasyonu(fon_gecmisleri: dict, sirali_fon_kodlari: list, fon_adlari: dict, gc):
+    """
+    Fonaliz sıralamasındaki fonlar için min. varyans, maks. Sharpe ve risk
+    paritesi ağırlıklarını ve etkin sınırı hesaplar; yerel depoya ve Google
+    Sheets'te Fonaliz sayfasının yanındaki sayfalara yazar.
+    """
+    print("\n" + "="*40)
+    print("      AŞAMA 4: PORTFÖY OPTİMİZASYONU BAŞLATILIYOR")
+    print("="*40)
+
+    df_agirliklar, df_ozet = kisa_liste_portfoyleri(fon_gecmisleri, sirali_fon_kodlari, fon_adlari)
+    if df_agirliklar.empty:
+        return
+    sonucu_kaydet('portfoy_agirliklari', df_agirliklar)
+    sonucu_kaydet('portfoy_ozeti', df_ozet)
+
+    try:
+        spreadsheet = gc.open_by_key(SHEET_ID)
+        for worksheet_name, df in [(WORKSHEET_NAME_PORTFOY, df_agirliklar), (WORKSHEET_NAME_ETKIN_SINIR, df_ozet)]:
+            try:
+                worksheet = spreadsheet.worksheet(worksheet_name)
+            except gspread.exceptions.WorksheetNotFound:
+                print(f"ℹ️ '{worksheet_name}' sayfası bulunamadı, yeni sayfa oluşturuluyor...")
+                worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows="1000", cols=30)
+
+            worksheet.clear()
+            df = df.replace([np.inf, -np.inf], np.nan).fillna('')
+            worksheet.update([df.columns.values.tolist()] + df.values.tolist())
+
+            body_resize = {"requests": [{"autoResizeDimensions": {"dimensions": {"sheetId": worksheet.id, "dimension": "COLUMNS"}}}]}
+            spreadsheet.batch_update(body_resize)
+            print(f"✅ Google Sheets '{worksheet_name}' sayfası güncellendi.")
+    except Exception as e:
+        print(f"❌ Google Sheets'e yazma hatası (Portföy): {e}")
+        traceback.print_exc()
+
 
 # --- HAFTALIK TARAMA FONKSİYONU ---
-def run_weekly_scan_to_gsheets(num_weeks: int, gc):
+def run_weekly_scan_to_gsheets(num_weeks: int, gc, kumeleme: bool = False, kategoriler: list = None):
     start_time_main = time.time()
     today = datetime.now(TIMEZONE).date()
-    all_fon_data_df = load_takasbank_fund_list()
+    all_fon_data_df = kategoriye_gore_filtrele(fon_listesini_yukle(), kategoriler)
 
     if all_fon_data_df.empty:
         print("❌ Taranacak fon listesi alınamadı. İşlem durduruldu.")
@@ -303,7 +492,6 @@ def run_weekly_scan_to_gsheets(num_weeks: int, gc):
     print(f"      AŞAMA 2: HAFTALIK TARAMA BAŞLATILIYOR | {num_weeks} Hafta Geriye Dönük")
     print("="*40)
 
-    total_fon_count = len(all_fon_data_df)
     genel_veri_cekme_baslangic_tarihi = today - timedelta(days=(num_weeks * 7) + 21 + TEFAS_CHUNK_DAYS) 
     
     fon_args_list = [(fon_kodu, genel_veri_cekme_baslangic_tarihi, today, DEFAULT_TEFAS_COLS)
@@ -313,57 +501,50 @@ def run_weekly_scan_to_gsheets(num_weeks: int, gc):
     first_fund_calculated_columns = []
     first_fund_processed = False
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        future_to_fon = {executor.submit(fetch_data_for_fund_parallel, args): args[0] for args in fon_args_list}
-        progress_bar = tqdm(concurrent.futures.as_completed(future_to_fon),
-                                  total=total_fon_count,
-                                  desc=" Haftalık Fonları Tarıyor")
+    fon_gecmisleri, fon_adlari, veri_kalitesi_raporu = fon_gecmislerini_cek(fon_args_list, " Haftalık Fonları Tarıyor")
 
-        for future in progress_bar:
-            fon_kodu_completed, fon_adi_fetched, fund_history = future.result()
-            try:
-                if fund_history is None or fund_history.empty:
-                    continue
-
-                current_fon_data = {'Fon Kodu': fon_kodu_completed, 'Fon Adı': fon_adi_fetched if fon_adi_fetched else fon_kodu_completed}
-                calculated_cols_current_fund, weekly_changes_list = [], []
-                first_week_end_price, last_week_start_price = np.nan, np.nan
-                current_week_end_date_cal = today
-
-                for i in range(num_weeks):
-                    current_week_start_date_cal = current_week_end_date_cal - timedelta(days=7)
-                    price_end = get_price_on_or_before(fund_history, current_week_end_date_cal)
-                    price_start = get_price_on_or_before(fund_history, current_week_start_date_cal)
-
-                    if i == 0: first_week_end_price = price_end
-                    if i == num_weeks - 1: last_week_start_price = price_start
-
-                    col_name = f"{current_week_end_date_cal.day:02d}.{current_week_start_date_cal.month:02d}-{current_week_end_date_cal.day:02d}.{current_week_end_date_cal.month:02d}.{current_week_end_date_cal.year % 100:02d}"
-                    weekly_change = calculate_change(price_end, price_start)
-                    current_fon_data[col_name] = weekly_change
-                    weekly_changes_list.append(weekly_change)
-                    calculated_cols_current_fund.append(col_name)
-                    current_week_end_date_cal = current_week_start_date_cal
-
-                if not first_fund_processed and calculated_cols_current_fund:
-                    first_fund_calculated_columns = calculated_cols_current_fund
-                    first_fund_processed = True
-
-                current_fon_data['Değerlendirme'] = calculate_change(first_week_end_price, last_week_start_price)
-                is_desired_trend = False
-                valid_changes = [chg for chg in weekly_changes_list if not pd.isna(chg)]
-
-                if len(valid_changes) == num_weeks and num_weeks >= 2:
-                    if all(valid_changes[j] > valid_changes[j+1] for j in range(num_weeks - 1)):
-                        is_desired_trend = True
-                
-                current_fon_data['is_desired_trend'] = bool(is_desired_trend)
-                current_fon_data['_DEBUG_WeeklyChanges_RAW'] = "'" + str([f"{x:.2f}" if not pd.isna(x) else "NaN" for x in weekly_changes_list])
-                current_fon_data['_DEBUG_IsDesiredTrend'] = bool(is_desired_trend)
-                weekly_results_dict[fon_kodu_completed] = current_fon_data
-            except Exception as exc:
-                print(f"❌ Hata (Haftalık - {fon_kodu_completed}): {exc}")
-                traceback.print_exc()
+    for fon_kodu_completed, fund_history in fon_gecmisleri.items():
+        fon_adi_fetched = fon_adlari[fon_kodu_completed]
+        try:
+            current_fon_data = {'Fon Kodu': fon_kodu_completed, 'Fon Adı': fon_adi_fetched if fon_adi_fetched else fon_kodu_completed}
+            calculated_cols_current_fund, weekly_changes_list = [], []
+            first_week_end_price, last_week_start_price = np.nan, np.nan
+            current_week_end_date_cal = today
+
+            for i in range(num_weeks):
+                current_week_start_date_cal = current_week_end_date_cal - timedelta(days=7)
+                price_end = get_price_on_or_before(fund_history, current_week_end_date_cal)
+                price_start = get_price_on_or_before(fund_history, current_week_start_date_cal)
+
+                if i == 0: first_week_end_price = price_end
+                if i == num_weeks - 1: last_week_start_price = price_start
+
+                col_name = f"{current_week_end_date_cal.day:02d}.{current_week_start_date_cal.month:02d}-{current_week_end_date_cal.day:02d}.{current_week_end_date_cal.month:02d}.{current_week_end_date_cal.year % 100:02d}"
+                weekly_change = calculate_change(price_end, price_start)
+                current_fon_data[col_name] = weekly_change
+                weekly_changes_list.append(weekly_change)
+                calculated_cols_current_fund.append(col_name)
+                current_week_end_date_cal = current_week_start_date_cal
+
+            if not first_fund_processed and calculated_cols_current_fund:
+                first_fund_calculated_columns = calculated_cols_current_fund
+                first_fund_processed = True
+
+            current_fon_data['Değerlendirme'] = calculate_change(first_week_end_price, last_week_start_price)
+            is_desired_trend = False
+            valid_changes = [chg for chg in weekly_changes_list if not pd.isna(chg)]
+
+            if len(valid_changes) == num_weeks and num_weeks >= 2:
+                if all(valid_changes[j] > valid_changes[j+1] for j in range(num_weeks - 1)):
+                    is_desired_trend = True
+            
+            current_fon_data['is_desired_trend'] = bool(is_desired_trend)
+            current_fon_data['_DEBUG_WeeklyChanges_RAW'] = "'" + str([f"{x:.2f}" if not pd.isna(x) else "NaN" for x in weekly_changes_list])
+            current_fon_data['_DEBUG_IsDesiredTrend'] = bool(is_desired_trend)
+            weekly_results_dict[fon_kodu_completed] = current_fon_data
+        except Exception as exc:
+            print(f"❌ Hata (Haftalık - {fon_kodu_completed}): {exc}")
+            traceback.print_exc()
 
     results_df = pd.DataFrame(list(weekly_results_dict.values()))
 
@@ -422,6 +603,10 @@ def run_weekly_scan_to_gsheets(num_weeks: int, gc):
     except Exception as e:
         print(f"❌ Google Sheets'e yazma hatası (Haftalık): {e}")
         traceback.print_exc()
+
+    sonucu_kaydet('haftalik', results_df[[col for col in final_view_columns if col in results_df.columns]])
+    sonucu_kaydet('veri_kalitesi', veri_kalitesi_raporu)
+    fiyatlari_kaydet(fon_gecmisleri)
     
     print(f"--- Haftalık Tarama Bitti. Toplam Süre: {time.time() - start_time_main:.2f} saniye ---")
     
@@ -432,13 +617,65 @@ def run_weekly_scan_to_gsheets(num_weeks: int, gc):
         print("ℹ️ Fonaliz için filtreyi geçen fon bulunamadı. Boş liste döndürülüyor.")
         return []
     
-    return filtrelenmis_df_fonaliz['Fon Kodu'].tolist()
+    fonaliz_listesi = filtrelenmis_df_fonaliz['Fon Kodu'].tolist()
+    if kumeleme:
+        fonaliz_listesi = benzer_fonlari_ele(fonaliz_listesi, fon_gecmisleri, results_df)
+    return fonaliz_listesi
+
+
+def fonaliz_sirasi_skorlari(fon_kodlari: list, fon_gecmisleri: dict):
+    """
+    Verilen fonları Fonaliz'in sıraladığı gibi (önce Sortino, eşitlikte Sharpe)
+    sıralar ve sıraya karşılık gelen bir skor döndürür: en iyi fonun skoru en
+    yüksektir. Metrikler, fiyat geçmişinin Fonaliz'in çektiği döneme düşen
+    kısmından hesapla_metrikler ile hesaplanır; metriği hesaplanamayan
+    fonların skoru NaN'dır.
+    """
+    baslangic = datetime.now(TIMEZONE).date() - relativedelta(months=FONALIZ_ANALIZ_SURESI_AY) - timedelta(days=TEFAS_CHUNK_DAYS)
+    siralama = ['Sortino Oranı (Yıllık)', 'Sharpe Oranı (Yıllık)']
+    metrikler = {}
+    for fon_kodu in fon_kodlari:
+        gecmis = fon_gecmisleri.get(fon_kodu)
+        if gecmis is None:
+            continue
+        sonuc = hesapla_metrikler(gecmis[gecmis['date'] >= baslangic].copy())
+        if sonuc:
+            metrikler[fon_kodu] = [sonuc[sutun] for sutun in siralama]
+    if not metrikler:
+        return pd.Series(dtype=float)
+    df_metrikler = pd.DataFrame.from_dict(metrikler, orient='index', columns=siralama)
+    sirali = df_metrikler.sort_values(by=siralama, ascending=[False, False], na_position='last').index
+    return pd.Series(np.arange(len(sirali), 0, -1, dtype=float), index=sirali)
+
+
+def benzer_fonlari_ele(fon_listesi: list, fon_gecmisleri: dict, results_df):
+    """
+    Taranan tüm fonların getiri korelasyonlarından benzer fon kümelerini bulur,
+    kümeleri dosyaya yazar ve Fonaliz listesinde her kümeden yalnızca bir fon
+    bırakır. Bırakılan fon, Fonaliz sıralamasında (Sortino, ardından Sharpe)
+    kümenin en üstünde yer alacak olandır; böylece eleme, sonraki sıralamanın
+    seçeceği fonu korur.
+    """
+    print(f"\nℹ️ {len(fon_gecmisleri)} fon için getiri korelasyonu hesaplanıyor (eşik: {KUMELEME_KORELASYON_ESIGI})...")
+    try:
+        kumeler = kumeleri_bul(getiri_matrisi_olustur(fon_gecmisleri))
+        skorlar = fonaliz_sirasi_skorlari([fon_kodu for kume in kumeler for fon_kodu in kume], fon_gecmisleri)
+        fon_adlari = results_df.set_index('Fon Kodu')['Fon Adı'].to_dict()
+        kume_raporu_yaz(kumeler, skorlar, KUME_RAPORU_DOSYASI, fon_adlari)
+        indirgenmis_liste = kume_temsilcilerine_indir(fon_listesi, kumeler, skorlar)
+        print(f"✅ {len(kumeler)} benzer fon kümesi '{KUME_RAPORU_DOSYASI}' dosyasına yazıldı. "
+              f"Fonaliz listesi {len(fon_listesi)} fondan {len(indirgenmis_liste)} fona indirildi.")
+        return indirgenmis_liste
+    except Exception as e:
+        print(f"❌ Fon kümeleme hatası: {e}. Fonaliz listesi olduğu gibi kullanılacak.")
+        traceback.print_exc()
+        return fon_listesi
 
 
 # --- TEKİL TARİH TARAMA FONKSİYONU ---
-def run_single_date_scan_to_gsheets(scan_date: date, gc):
+def run_single_date_scan_to_gsheets(scan_date: date, gc, kategoriler: list = None):
     start_time_main = time.time()
-    all_fon_data_df = load_takasbank_fund_list()
+    all_fon_data_df = kategoriye_gore_filtrele(fon_listesini_yukle(), kategoriler)
 
     if all_fon_data_df.empty:
         print("❌ Taranacak fon listesi alınamadı. İşlem durduruldu.")
@@ -448,7 +685,6 @@ def run_single_date_scan_to_gsheets(scan_date: date, gc):
     print(f"      AŞAMA 1: TEKİL TARAMA BAŞLATILIYOR | Bitiş Tarihi: {scan_date.strftime('%d.%m.%Y')}")
     print("="*40)
 
-    total_fon_count = len(all_fon_data_df)
     genel_veri_cekme_baslangic_tarihi = scan_date - relativedelta(years=1, months=2) - timedelta(days=TEFAS_CHUNK_DAYS)
     
     fon_args_list = [(fon_kodu, genel_veri_cekme_baslangic_tarihi, scan_date, DEFAULT_TEFAS_COLS)
@@ -456,41 +692,34 @@ def run_single_date_scan_to_gsheets(scan_date: date, gc):
 
     all_results = []
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        future_to_fon = {executor.submit(fetch_data_for_fund_parallel, args): args[0] for args in fon_args_list}
-        progress_bar = tqdm(concurrent.futures.as_completed(future_to_fon),
-                                  total=total_fon_count,
-                                  desc=" Tekil Fonları Tarıyor")
+    fon_gecmisleri, fon_adlari, veri_kalitesi_raporu = fon_gecmislerini_cek(fon_args_list, " Tekil Fonları Tarıyor")
 
-        for future in progress_bar:
-            fon_kodu_completed, fon_adi_fetched, fund_history = future.result()
-            try:
-                if fund_history is None or fund_history.empty:
-                    continue
-
-                fiyat_son = get_price_on_or_before(fund_history, scan_date)
-                
-                degisimler = {}
-                periods = {
-                    'Günlük %': timedelta(days=1), 'Haftalık %': timedelta(weeks=1),
-                    '2 Haftalık %': timedelta(weeks=2), 'Aylık %': relativedelta(months=1),
-                    '3 Aylık %': relativedelta(months=3), '6 Aylık %': relativedelta(months=6),
-                    '1 Yıllık %': relativedelta(years=1)
-                }
-                
-                if not pd.isna(fiyat_son):
-                    for name, period_delta in periods.items():
-                        target_date = scan_date - period_delta
-                        fiyat_once = get_price_on_or_before(fund_history, target_date)
-                        degisimler[name] = calculate_change(fiyat_son, fiyat_once)
+    for fon_kodu_completed, fund_history in fon_gecmisleri.items():
+        fon_adi_fetched = fon_adlari[fon_kodu_completed]
+        try:
+            fiyat_son = get_price_on_or_before(fund_history, scan_date)
+            
+            degisimler = {}
+            periods = {
+                'Günlük %': timedelta(days=1), 'Haftalık %': timedelta(weeks=1),
+                '2 Haftalık %': timedelta(weeks=2), 'Aylık %': relativedelta(months=1),
+                '3 Aylık %': relativedelta(months=3), '6 Aylık %': relativedelta(months=6),
+                '1 Yıllık %': relativedelta(years=1)
+            }
+            
+            if not pd.isna(fiyat_son):
+                for name, period_delta in periods.items():
+                    target_date = scan_date - period_delta
+                    fiyat_once = get_price_on_or_before(fund_history, target_date)
+                    degisimler[name] = calculate_change(fiyat_son, fiyat_once)
 
-                if any(degisimler.values()):
-                    result_row = {'Fon Kodu': fon_kodu_completed, 'Fon Adı': fon_adi_fetched, **degisimler}
-                    all_results.append(result_row)
+            if any(degisimler.values()):
+                result_row = {'Fon Kodu': fon_kodu_completed, 'Fon Adı': fon_adi_fetched, **degisimler}
+                all_results.append(result_row)
 
-            except Exception as e:
-                print(f"❌ Hata (Tekil - {fon_kodu_completed}): {e}")
-                traceback.print_exc()
+        except Exception as e:
+            print(f"❌ Hata (Tekil - {fon_kodu_completed}): {e}")
+            traceback.print_exc()
 
     if not all_results:
         print("\n--- SONUÇ: Tekil tarama için veri bulunamadı. ---")
@@ -500,6 +729,9 @@ def run_single_date_scan_to_gsheets(scan_date: date, gc):
     sutun_sirasi = ['Fon Kodu', 'Fon Adı', 'Günlük %', 'Haftalık %', '2 Haftalık %', 'Aylık %', '3 Aylık %', '6 Aylık %', '1 Yıllık %']
     results_df = results_df[sutun_sirasi]
     results_df_sirali = results_df.sort_values(by='Haftalık %', ascending=False)
+    sonucu_kaydet('tekil', results_df_sirali)
+    sonucu_kaydet('veri_kalitesi', veri_kalitesi_raporu)
+    fiyatlari_kaydet(fon_gecmisleri)
     
     print(f"\n\n✅ Tekil tarama tamamlandı. Sonuçlar Google Sheets'teki '{WORKSHEET_NAME_MANUAL}' sayfasına yazılıyor...")
     try:
@@ -522,6 +754,87 @@ def run_single_date_scan_to_gsheets(scan_date: date, gc):
     print(f"--- Tekil Tarama Bitti. Toplam Süre: {time.time() - start_time_main:.2f} saniye ---")
 
 
+# --- HAFTALIK TARAMA + FONALİZ ---
+def run_weekly_and_fonaliz(num_weeks: int, gc, coklu_donem: bool = False, kumeleme: bool = False, kategoriler: list = None,
+                           portfoy: bool = False):
+    # Haftalık taramayı çalıştır ve Fonaliz için filtrelenmiş fon listesini al
+    fonaliz_icin_fonlar = run_weekly_scan_to_gsheets(num_weeks, gc, kumeleme=kumeleme, kategoriler=kategoriler)
+    
+    # Eğer haftalık taramadan dönen listede fon varsa Fonaliz'i çalıştır
+    if isinstance(fonaliz_icin_fonlar, list) and fonaliz_icin_fonlar:
+        run_fonaliz_scan_to_gsheets(fonaliz_icin_fonlar, gc, coklu_donem=coklu_donem, portfoy=portfoy)
+    else:
+        print("\nℹ️ Haftalık tarama sonucunda Fonaliz için uygun fon bulunamadı.")
+
+
+# --- SÜREKLİ ÇALIŞMA (serve/watch) MODU ---
+def sonraki_gorev(simdi: datetime):
+    """
+    DAEMON_GOREV_PLANI'na göre şu andan sonraki ilk görevi (zaman, görev) döndürür.
+    """
+    for gun in range(8):
+        tarih = simdi.date() + timedelta(days=gun)
+        if tarih.weekday() not in DAEMON_IS_GUNLERI:
+            continue
+        for saat_dakika, gorev in sorted(DAEMON_GOREV_PLANI):
+            saat, dakika = map(int, saat_dakika.split(':'))
+            zaman = TIMEZONE.localize(datetime(tarih.year, tarih.month, tarih.day, saat, dakika))
+            if zaman > simdi:
+                return zaman, gorev
+    return None, None
+
+def gorevi_calistir(gorev: str, gc, num_weeks: int, coklu_donem: bool, kumeleme: bool, kategoriler: list = None,
+                    portfoy: bool = False):
+    baslangic = time.time()
+    print(f"\n--- Planlı görev başlatıldı: {gorev} ({datetime.now(TIMEZONE).strftime('%d.%m.%Y %H:%M')}) ---")
+    try:
+        if gorev == 'weekly':
+            run_weekly_and_fonaliz(num_weeks, gc, coklu_donem=coklu_donem, kumeleme=kumeleme, kategoriler=kategoriler,
+                                   portfoy=portfoy)
+        elif gorev == 'single':
+            run_single_date_scan_to_gsheets(datetime.now(TIMEZONE).date() - timedelta(days=1), gc, kategoriler=kategoriler)
+        else:
+            print(f"❌ Hata: Bilinmeyen görev '{gorev}'.")
+            return
+        calisma_tamamlandi(gorev)
+    except Exception as e:
+        print(f"❌ Planlı görev ({gorev}) sırasında beklenmedik bir hata oluştu: {e}")
+        traceback.print_exc()
+    print(f"--- Planlı görev bitti: {gorev}. Süre: {time.time() - baslangic:.2f} saniye ---")
+
+def run_daemon(gc, num_weeks: int, coklu_donem: bool = False, kumeleme: bool = False, kategoriler: list = None,
+               portfoy: bool = False):
+    """
+    Süreci açık tutar: fon listesi, fiyat geçmişleri ve Google Sheets istemcisi
+    bellekte kalır, görevler DAEMON_GOREV_PLANI'na göre çalıştırılır. İlk
+    görevden sonra her görev TEFAS'tan yalnızca yeni günleri çeker.
+    """
+    global _sicak_onbellek
+    _sicak_onbellek = SicakOnbellek()
+    plan = ', '.join(f"{saat} {gorev}" for saat, gorev in sorted(DAEMON_GOREV_PLANI))
+    print(f"\n✅ Sürekli çalışma modu başlatıldı. Görev planı (İstanbul saati, iş günleri): {plan}")
+
+    # Crawler oturumları görevler arasında açık ve ısınmış kalır; yalnızca
+    # sürekli çalışma modu sona erdiğinde kapatılır.
+    try:
+        if DAEMON_BASLANGICTA_CALISTIR:
+            gorevi_calistir('weekly', gc, num_weeks, coklu_donem, kumeleme, kategoriler, portfoy)
+
+        while True:
+            zaman, gorev = sonraki_gorev(datetime.now(TIMEZONE))
+            if zaman is None:
+                print("❌ Hata: Görev planında çalıştırılacak görev bulunamadı.")
+                return
+            print(f"\nℹ️ Sonraki görev: {gorev} - {zaman.strftime('%d.%m.%Y %H:%M')}")
+            while (kalan := (zaman - datetime.now(TIMEZONE)).total_seconds()) > 0:
+                time.sleep(min(kalan, 60))
+            gorevi_calistir(gorev, gc, num_weeks, coklu_donem, kumeleme, kategoriler, portfoy)
+    except KeyboardInterrupt:
+        print("\nℹ️ Sürekli çalışma modu durduruluyor...")
+    finally:
+        havuzu_kapat()
+
+
 # --- ANA ÇALIŞTIRMA BLOĞU ---
 if __name__ == '__main__':
     gc_instance = google_sheets_auth()
@@ -531,7 +844,19 @@ if __name__ == '__main__':
     # python script_adi.py weekly 4 -> 4 haftalık tarama yapar
     # python script_adi.py single 2023-10-27 -> Belirtilen tarih için tekil tarama
     # python script_adi.py -> Varsayılan olarak 4 haftalık tarama ve fonaliz yapar
+    # python script_adi.py weekly 4 --coklu -> Fonaliz'i 1/3/6/12 aylık dönemler için yapar
+    # python script_adi.py weekly 4 --kumele -> Benzer fonları kümeler, Fonaliz'e her kümeden bir fon gönderir
+    # python script_adi.py weekly 4 --portfoy -> Fonaliz sıralamasından min. varyans, maks. Sharpe ve risk paritesi portföylerini oluşturur
+    # python script_adi.py weekly 4 --category=hisse_yogun,hisse -> Yalnızca verilen kategorilerdeki fonları tarar (tüm modlarda geçerli)
+    # python script_adi.py serve 4 -> Süreci açık tutar, görevleri DAEMON_GOREV_PLANI'na göre artımlı olarak çalıştırır ('watch' ile aynı)
     
+    secenekler = [arg.lower() for arg in sys.argv[1:] if arg.startswith('--')]
+    sys.argv = [sys.argv[0]] + [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    coklu_donem_fonaliz = '--coklu' in secenekler
+    fon_kumeleme = '--kumele' in secenekler
+    fon_kategorileri = kategori_secenegini_oku(secenekler)
+    portfoy_olustur = '--portfoy' in secenekler
+
     scan_type = 'weekly' # Varsayılan tarama tipi
     if len(sys.argv) > 1:
         scan_type = sys.argv[1].lower()
@@ -545,7 +870,7 @@ if __name__ == '__main__':
             else:
                 scan_date_obj = datetime.now(TIMEZONE).date() - timedelta(days=1)
             
-            run_single_date_scan_to_gsheets(scan_date_obj, gc_instance)
+            run_single_date_scan_to_gsheets(scan_date_obj, gc_instance, kategoriler=fon_kategorileri)
         except ValueError:
             print("❌ Hata: Tarih formatı yanlış. Lütfen YYYY-MM-DD formatında girin.")
         except Exception as e:
@@ -557,20 +882,27 @@ if __name__ == '__main__':
             # Hafta sayısı argümanı varsa onu kullan, yoksa 4 varsay
             num_weeks_to_scan = int(sys.argv[2]) if len(sys.argv) > 2 else 4
             
-            # Haftalık taramayı çalıştır ve Fonaliz için filtrelenmiş fon listesini al
-            fonaliz_icin_fonlar = run_weekly_scan_to_gsheets(num_weeks_to_scan, gc_instance)
-            
-            # Eğer haftalık taramadan dönen listede fon varsa Fonaliz'i çalıştır
-            if fonaliz_icin_fonlar:
-                run_fonaliz_scan_to_gsheets(fonaliz_icin_fonlar, gc_instance)
-            else:
-                print("\nℹ️ Haftalık tarama sonucunda Fonaliz için uygun fon bulunamadı.")
-                
+            run_weekly_and_fonaliz(num_weeks_to_scan, gc_instance, coklu_donem=coklu_donem_fonaliz, kumeleme=fon_kumeleme,
+                                   kategoriler=fon_kategorileri, portfoy=portfoy_olustur)
         except ValueError:
             print("❌ Hata: Hafta sayısı bir tamsayı olmalıdır.")
         except Exception as e:
             print(f"❌ Haftalık tarama sırasında beklenmedik bir hata oluştu: {e}")
             traceback.print_exc()
 
+    elif scan_type in ('serve', 'watch'):
+        try:
+            num_weeks_to_scan = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+        except ValueError:
+            print("❌ Hata: Hafta sayısı bir tamsayı olmalıdır.")
+            sys.exit(1)
+        run_daemon(gc_instance, num_weeks_to_scan, coklu_donem=coklu_donem_fonaliz, kumeleme=fon_kumeleme,
+                   kategoriler=fon_kategorileri, portfoy=portfoy_olustur)
+        sys.exit(0) # Görevler çalışma işaretini kendileri günceller
+
     else:
-        print(f"❌ Hata: Geçersiz tarama tipi '{scan_type}'. 'single' veya 'weekly' kullanın.")
+        print(f"❌ Hata: Geçersiz tarama tipi '{scan_type}'. 'single', 'weekly' veya 'serve' kullanın.")
+        sys.exit(1)
+
+    # Yerel sorgu servisinin yeni sonuçları yüklemesi için çalışmanın bittiğini işaretle
+    calisma_tamamlandi(scan_type)